@@ -0,0 +1,86 @@
+"""
+Cold-start benchmark for the API process.
+
+Imports ``main`` in fresh interpreters under ``-X importtime`` and fails
+(exit status 1) when the median cumulative import time exceeds the budget,
+or when a heavy module that must stay lazy (numpy, matplotlib) is pulled
+in at import time.
+
+Usage (from lab-simulator/backend):
+    python benchmarks/bench_cold_start.py [--budget-ms 1500] [--runs 5]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that only the curve endpoints need; they must load on first use.
+LAZY_MODULES = ("numpy", "matplotlib")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def measure_once() -> tuple:
+    """Return (cumulative µs for ``main``, set of top-level modules imported)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"'import main' failed:\n{proc.stderr}")
+
+    total_us = None
+    modules = set()
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        name = m.group(4)
+        modules.add(name.split(".")[0])
+        if name == "main":
+            total_us = int(m.group(2))
+    if total_us is None:
+        raise SystemExit("'main' not found in -X importtime output")
+    return total_us, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    times_ms = []
+    loaded = set()
+    for _ in range(args.runs):
+        total_us, modules = measure_once()
+        times_ms.append(total_us / 1000)
+        loaded |= modules
+
+    median = statistics.median(times_ms)
+    print(f"import main: median {median:.0f} ms, "
+          f"min {min(times_ms):.0f} ms, max {max(times_ms):.0f} ms ({args.runs} runs)")
+
+    failed = False
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: over budget ({median:.0f} ms > {args.budget_ms:.0f} ms)")
+        failed = True
+    if not failed:
+        print(f"OK: within {args.budget_ms:.0f} ms budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Accuracy and speed benchmark for the exact equilibrium solver.
+
+For every practice with a curve, compares the solver's pX against the
+piecewise before/at/after-equivalence approximations it replaced, on a
+dense volume grid away from the equivalence point (where those
+approximations hold), and times the curve computation and a cold SVG
+render.  The Volhard practice is also timed with the AgCl/AgSCN
+competition switched on (``coated=False``).
+
+Fails (exit status 1) when the solver drifts from the approximations by
+more than ``--max-diff`` pX units, or a median timing exceeds its budget.
+
+Usage (from lab-simulator/backend):
+    python benchmarks/bench_equilibrium_solver.py [--max-diff 0.01]
+        [--compute-budget-ms 20] [--render-budget-ms 1000] [--runs 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from data.registry import get_all_practices  # noqa: E402
+from services.curve_engine import compute_curve, curve_model, px_at  # noqa: E402
+from services.titration_curve import generate_titration_curve  # noqa: E402
+
+# Grid points closer than this fraction of V_eq to the equivalence point
+# are left out of the comparison: the approximations break down there.
+EQ_MARGIN = 0.02
+
+
+def approximate_px(model: dict, V) -> np.ndarray:
+    """The previous piecewise kernel, kept here as the reference."""
+    V = np.asarray(V, dtype=float)
+    Vt = model["v0"] + V
+    K, n_X, c, v_eq = model["K"], model["n_analyte"], model["c_titrant"], model["v_eq"]
+    left = np.maximum((n_X - c * V) / Vt, 1e-15)
+    titrant_exc = np.maximum((c * V - n_X) / Vt, 1e-15)
+    if model["chemistry"] == "complexometric":
+        complexed = n_X / Vt
+        at_eq = np.sqrt(np.maximum(complexed / K, 1e-30))
+        after = complexed / (K * titrant_exc)
+    else:
+        at_eq = np.full_like(Vt, np.sqrt(K))
+        after = K / titrant_exc
+    X = np.where(V < v_eq - 0.005, left, np.where(V > v_eq + 0.005, after, at_eq))
+    pX = -np.log10(np.maximum(X, 1e-15))
+    if model["p_complement"] is not None:
+        pX = model["p_complement"] - pX
+    lo, hi = model["p_range"]
+    return np.clip(pX, lo, hi)
+
+
+def median_ms(fn, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-diff", type=float, default=0.01)
+    parser.add_argument("--compute-budget-ms", type=float, default=20.0)
+    parser.add_argument("--render-budget-ms", type=float, default=1000.0)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    cases = []
+    for practice in sorted(get_all_practices(), key=lambda p: p["id"]):
+        curve = (practice.get("titration") or {}).get("curve")
+        if curve is None:
+            continue
+        cases.append((practice["id"], {}))
+        if curve.get("competingPrecipitate"):
+            cases.append((practice["id"], {"coated": False}))
+
+    failed = False
+    for practice_id, extra in cases:
+        model = curve_model(practice_id, extra)
+        label = f"practice {practice_id}" + (" (uncoated)" if extra else "")
+
+        compute = median_ms(lambda: compute_curve(model), args.runs)
+        line = f"{label:<24} compute {compute:6.2f} ms"
+
+        if not extra:
+            V = np.linspace(0.02, model["x_max"], 5001)
+            far = np.abs(V - model["v_eq"]) > EQ_MARGIN * model["v_eq"]
+            diff = float(np.abs(px_at(model, V) - approximate_px(model, V))[far].max())
+            start = time.perf_counter()
+            generate_titration_curve(practice_id, {"recorded_volume": model["v_eq"]}, "svg")
+            render = (time.perf_counter() - start) * 1000
+            line += f"  render {render:6.0f} ms  max |ΔpX| {diff:.1e}"
+            if diff > args.max_diff:
+                line += "  FAIL: differs from approximation"
+                failed = True
+            if render > args.render_budget_ms:
+                line += "  FAIL: render over budget"
+                failed = True
+        if compute > args.compute_budget_ms:
+            line += "  FAIL: compute over budget"
+            failed = True
+        print(line)
+
+    print("FAIL" if failed else
+          f"OK: within {args.max_diff} pX, {args.compute_budget_ms:.0f} ms compute "
+          f"and {args.render_budget_ms:.0f} ms render budgets")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Concurrent write throughput of SQLite with and without the tuned pragmas.
+
+Simulates a class of ``--students`` working at once: each student owns a
+practice session and sends ``--clicks`` stage updates, every one handled
+like an API request (own DB session, SELECT by id, UPDATE, commit), while
+a teacher polls the section's sessions in parallel.  Runs the same load on
+a fresh database file for the ``default`` profile (SQLite's own settings)
+and the ``performance`` profile from ``config.Settings`` and reports
+writes/s, p95 latency and "database is locked" errors.
+
+Fails (exit status 1) when the tuned profile has any locked errors or is
+not at least ``--min-speedup`` times faster.
+
+Usage (from lab-simulator/backend):
+    python benchmarks/bench_sqlite_write.py [--students 40] [--clicks 25] [--min-speedup 1.0]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+import models  # noqa: E402,F401
+from config import Settings  # noqa: E402
+from database import Base, configure_sqlite  # noqa: E402
+from models.session import PracticeSession  # noqa: E402
+
+
+async def run_profile(profile: str, path: str, students: int, clicks: int) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    configure_sqlite(engine, Settings(SQLITE_PROFILE=profile).sqlite_pragmas)
+    sessionmaker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessionmaker() as db:
+        sessions = [PracticeSession(practice_id=5, student_name=f"alumno{i}") for i in range(students)]
+        db.add_all(sessions)
+        await db.commit()
+        ids = [s.id for s in sessions]
+
+    latencies, locked = [], 0
+    done = asyncio.Event()
+
+    async def student(session_id: str) -> None:
+        nonlocal locked
+        for stage in range(clicks):
+            start = time.perf_counter()
+            try:
+                async with sessionmaker() as db:
+                    session = (await db.execute(
+                        select(PracticeSession).where(PracticeSession.id == session_id)
+                    )).scalar_one()
+                    session.current_stage = stage % 9 + 1
+                    session.recorded_volume = stage * 0.1
+                    await db.commit()
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                locked += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    async def teacher() -> None:
+        while not done.is_set():
+            async with sessionmaker() as db:
+                (await db.execute(select(PracticeSession).where(PracticeSession.id.in_(ids)))).all()
+            await asyncio.sleep(0.01)
+
+    poller = asyncio.create_task(teacher())
+    start = time.perf_counter()
+    await asyncio.gather(*(student(i) for i in ids))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await poller
+    await engine.dispose()
+
+    return {
+        "writes_per_s": len(latencies) / elapsed,
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else float("nan"),
+        "locked": locked,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--clicks", type=int, default=25)
+    parser.add_argument("--min-speedup", type=float, default=1.0)
+    parser.add_argument("--dir", default=None, help="where to create the database files (default: temp dir)")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for profile in ("default", "performance"):
+            path = os.path.join(tmp, f"{profile}.db")
+            results[profile] = r = asyncio.run(run_profile(profile, path, args.students, args.clicks))
+            print(f"{profile:<12} {r['writes_per_s']:8.0f} writes/s  p95 {r['p95_ms']:7.1f} ms  "
+                  f"locked {r['locked']}")
+
+    speedup = results["performance"]["writes_per_s"] / results["default"]["writes_per_s"]
+    failed = results["performance"]["locked"] > 0 or speedup < args.min_speedup
+    print(f"{'FAIL' if failed else 'OK'}: performance profile {speedup:.2f}x the default throughput")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Throughput and latency benchmark for the server-side burette store.
+
+Opens ``--sessions`` titrations spread over every practice with a curve,
+then drives them as concurrent clients would: each round every session
+adds one drop or stream step through ``TitrationStateStore.add``, so all
+additions of a round are flushed in one vectorized pass.  Reports the
+whole round and, separately, the time the flush itself holds the event
+loop (the rest is the benchmark's own coroutines and futures).  Fails
+(exit status 1) when the mean cost per step exceeds ``--budget-us``.
+The store runs without its journal, so no database is needed.
+
+Usage (from lab-simulator/backend):
+    python benchmarks/bench_titration_state.py [--sessions 5000] [--rounds 20] [--budget-us 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.titration_state import TitrationStateStore  # noqa: E402
+
+PRACTICES = (2, 3, 4, 5)
+
+
+async def run(sessions: int, rounds: int) -> tuple:
+    store = TitrationStateStore(capacity=sessions)
+    ids = [f"bench-{i}" for i in range(sessions)]
+    for i, session_id in enumerate(ids):
+        store.open(session_id, PRACTICES[i % len(PRACTICES)], {})
+
+    flush = store._flush
+    flush_ms = []
+
+    def timed_flush():
+        start = time.perf_counter()
+        flush()
+        flush_ms.append((time.perf_counter() - start) * 1000)
+
+    store._flush = timed_flush
+
+    round_ms = []
+    for r in range(rounds):
+        kind = "stream" if r % 4 else "drop"
+        start = time.perf_counter()
+        await asyncio.gather(*(store.add(session_id, kind) for session_id in ids))
+        round_ms.append((time.perf_counter() - start) * 1000)
+    return round_ms, flush_ms
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--budget-us", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    round_ms, flush_ms = asyncio.run(run(args.sessions, args.rounds))
+    median = statistics.median(round_ms)
+    per_step_us = median * 1000 / args.sessions
+    print(f"{args.sessions} sessions: median {median:.1f} ms per round, "
+          f"{per_step_us:.1f} µs per step ({args.rounds} rounds)")
+    print(f"  flush: median {statistics.median(flush_ms):.1f} ms per round "
+          f"(max {max(flush_ms):.1f} ms)")
+
+    if per_step_us > args.budget_us:
+        print(f"FAIL: over budget ({per_step_us:.1f} µs > {args.budget_us:.0f} µs)")
+        return 1
+    print(f"OK: within {args.budget_us:.0f} µs budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
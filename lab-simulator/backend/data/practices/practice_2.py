@@ -29,6 +29,7 @@ PRACTICE_2 = {
         "defaultValue": 1.000,
         "fixedValue": False,
         "range": [0.850, 1.150],   # g
+        "resolution": 0.0001,   # g — balanza analítica
         "unit": "g",
         "label": "Masa de grasa (balanza analítica)",
         "instruction": "Pesar aproximadamente 1 g de la grasa seleccionada en la balanza analítica. La masa exacta se usará en el cálculo.",
@@ -175,6 +176,31 @@ PRACTICE_2 = {
         "dropVolume": 0.05,
         "streamVolume": 0.50,
         "endpointTolerance": 0.5,
+
+        # Stage 8: Theoretical curve — pH vs V(HCl) (see services/curve_engine.py)
+        # Excess OH⁻ back-titrated with H⁺; pH = 14 − pOH
+        "curve": {
+            "chemistry": "acid-base",
+            "constants": {"Kw": 1.0e-14},
+            "initialVolume": 25.0,          # KOH 0.50 M; the fat is weighed, not measured by volume
+            "addSampleVolume": False,
+            "pRange": [0, 14],
+            "pComplement": 14.0,
+            "xMaxFactor": 1.65,
+            "yMax": 14,
+            "legendLoc": "lower left",
+            "annotationY": [0.875, 0.71],
+            "labels": {
+                "x": r"$V_{\mathrm{HCl}}\ /\ \mathrm{mL}$",
+                "y": r"$\mathrm{pH}$",
+                "xPlain": "V(HCl) / mL",
+                "yPlain": "pH",
+                "title": "Curva de Titulación — Índice de Saponificación",
+                "sampleLabel": r"$m_{\mathrm{grasa}}$",
+                "sampleFormat": ".3f",
+                "reaction": r"$\mathrm{OH}^{-}_{\mathrm{(exc)}}\ +\ \mathrm{H}^{+}\ \longrightarrow\ \mathrm{H_2O}$",
+            },
+        },
     },
 
     # Stage 7: Calculation
@@ -184,6 +210,7 @@ PRACTICE_2 = {
     "calculation": {
         "formulaText": "IS = [(V_KOH × M_KOH) − (V_HCl × M_HCl)] × PM_KOH × 1000 / m_grasa",
         "formulaLatex": r"\text{IS} = \frac{[(V_{KOH} \times M_{KOH}) - (V_{HCl} \times M_{HCl})] \times PM_{KOH} \times 1000}{m_{grasa}}",
+        "expression": "((V_KOH / 1000 * M_KOH) - (V_HCl / 1000 * M_HCl)) * PM_KOH * 1000 / m_grasa",
         "variables": [
             {"symbol": "V_KOH",  "name": "Volumen de KOH agregado",    "unit": "mL",    "source": "constant",        "value": 25,   "description": "25 mL de KOH 0.50 M agregados en exceso"},
             {"symbol": "M_KOH",  "name": "Molaridad del KOH",          "unit": "mol/L", "source": "constant",        "value": 0.50},
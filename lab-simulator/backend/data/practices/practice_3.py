@@ -27,6 +27,7 @@ PRACTICE_3 = {
         "defaultValue": 10,
         "fixedValue": True,
         "range": [10, 10],
+        "resolution": 0.02,   # mL — pipeta volumétrica clase A
         "unit": "mL",
         "label": "Volumen de muestra (pipeta volumétrica)",
         "instruction": "Tomar exactamente 10 mL de la solución salina con la pipeta volumétrica de 10 mL y transferir al matraz.",
@@ -109,12 +110,34 @@ PRACTICE_3 = {
         "dropVolume": 0.05,
         "streamVolume": 0.50,
         "endpointTolerance": 0.5,
+
+        # Stage 8: Theoretical curve — pCl vs V(AgNO₃) (see services/curve_engine.py)
+        # Ksp(AgCl) = 1.8 × 10⁻¹⁰
+        "curve": {
+            "chemistry": "precipitation",
+            "constants": {"Ksp": 1.8e-10},
+            "initialVolume": 1.0,           # indicator, plus the sample
+            "addSampleVolume": True,
+            "pRange": [0, 10],
+            "xMaxFactor": 1.65,
+            "yMax": 10,
+            "annotationY": [0.875, 0.71],
+            "labels": {
+                "x": r"$V_{\mathrm{AgNO_3}}\ /\ \mathrm{mL}$",
+                "y": r"$\mathrm{p}[\mathrm{Cl}^{-}]$",
+                "xPlain": "V(AgNO3) / mL",
+                "yPlain": "pCl",
+                "title": "Curva de Titulación — Argentometría (Mohr)",
+                "reaction": r"$\mathrm{Ag}^{+}\ +\ \mathrm{Cl}^{-}\ \longrightarrow\ \mathrm{AgCl}{\downarrow}$",
+            },
+        },
     },
 
     # ── Stages 6-7: Calculation ──────────────────────────────────────────────
     "calculation": {
         "formulaText": "mg Cl⁻/mL = (V_AgNO₃ × M_AgNO₃ × PM_Cl) / V_muestra",
         "formulaLatex": r"\text{mg Cl}^{-}/\text{mL} = \frac{V_{AgNO_3} \times M_{AgNO_3} \times PM_{Cl}}{V_{muestra}}",
+        "expression": "V_AgNO3 * M_AgNO3 * PM_Cl / V_muestra",
         "variables": [
             {
                 "symbol": "V_AgNO3",
@@ -27,6 +27,7 @@ PRACTICE_4 = {
         "defaultValue": 10,
         "fixedValue": True,
         "range": [10, 10],
+        "resolution": 0.02,   # mL — pipeta volumétrica clase A
         "unit": "mL",
         "label": "Volumen de muestra (pipeta volumétrica)",
         "instruction": "Tomar exactamente 10 mL de la solución salina con la pipeta volumétrica de 10 mL y transferir al matraz.",
@@ -203,12 +204,41 @@ PRACTICE_4 = {
         "dropVolume": 0.01,
         "streamVolume": 0.50,
         "endpointTolerance": 0.5,
+
+        # Stage 8: Theoretical curve — pAg vs V(KSCN) (see services/curve_engine.py)
+        # Excess Ag⁺ back-titrated with SCN⁻; Ksp(AgSCN) = 1.0 × 10⁻¹²
+        "curve": {
+            "chemistry": "precipitation",
+            "constants": {"Ksp": 1.0e-12},
+            # AgCl left in the flask can trade Cl⁻ for SCN⁻ unless nitrobenzene coats it
+            "competingPrecipitate": {
+                "Ksp": 1.8e-10,             # AgCl
+                "reagentTotal": 5.0,        # mmol Ag⁺ added before back-titrating (50 mL × 0.10 M)
+                "coated": True,
+            },
+            # 10 sample + 10 H₂O + 1 HNO₃ + 50 AgNO₃ + 1 NB + 1 indicator
+            "initialVolume": 73.0,
+            "addSampleVolume": False,
+            "pRange": [0, 12],
+            "xMaxFactor": 1.65,
+            "yMax": 12,
+            "annotationY": [0.875, 0.71],
+            "labels": {
+                "x": r"$V_{\mathrm{KSCN}}\ /\ \mathrm{mL}$",
+                "y": r"$\mathrm{p}[\mathrm{Ag}^{+}]$",
+                "xPlain": "V(KSCN) / mL",
+                "yPlain": "pAg",
+                "title": "Curva de Titulación — Método de Volhard",
+                "reaction": r"$\mathrm{Ag}^{+}_{\mathrm{(exc)}}\ +\ \mathrm{SCN}^{-}\ \longrightarrow\ \mathrm{AgSCN}{\downarrow}\ +\ \mathrm{K}^{+}$",
+            },
+        },
     },
 
     # Stages 6-7: Calculation
     "calculation": {
         "formulaText": "mg Cl⁻/mL = [(V_AgNO₃ × M_AgNO₃) − (V_KSCN × M_KSCN)] × PM_Cl / V_muestra",
         "formulaLatex": r"\text{mg Cl}^{-}/\text{mL} = \frac{(V_{AgNO_3} \times M_{AgNO_3}) - (V_{KSCN} \times M_{KSCN}) \times PM_{Cl}}{V_{muestra}}",
+        "expression": "((V_AgNO3 * M_AgNO3) - (V_KSCN * M_KSCN)) * PM_Cl / V_muestra",
         "variables": [
             {"symbol": "V_AgNO3", "name": "Volumen de AgNO₃ agregado", "unit": "mL", "source": "constant", "value": 50, "description": "Volumen de AgNO₃ 0.10 M agregado en exceso"},
             {"symbol": "M_AgNO3", "name": "Molaridad del AgNO₃", "unit": "mol/L", "source": "constant", "value": 0.10},
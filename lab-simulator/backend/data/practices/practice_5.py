@@ -27,6 +27,7 @@ PRACTICE_5 = {
         "defaultValue": 100,
         "fixedValue": False,
         "range": [10, 250],
+        "resolution": 0.5,   # mL — lectura de la probeta
         "unit": "mL",
         "label": "Volumen de agua de la llave",
         "instruction": "Medir el volumen de agua de la llave en la probeta de 250 mL (se recomiendan 100 mL)",
@@ -138,12 +139,33 @@ PRACTICE_5 = {
         "dropVolume": 0.05,
         "streamVolume": 0.50,
         "endpointTolerance": 0.3,
+
+        # Stage 8: Theoretical curve — pCa vs V(EDTA) (see services/curve_engine.py)
+        # K′f(CaY²⁻) at pH 10 = Kf × αY4⁻ = 10^10.65 × 0.36 ≈ 1.61 × 10¹⁰
+        "curve": {
+            "chemistry": "complexometric",
+            "constants": {"Kf": 10 ** 10.65, "alphaY4": 0.36},
+            "initialVolume": 10.0,          # pH-10 buffer, plus the sample
+            "addSampleVolume": True,
+            "pRange": [0, 14],
+            "xMaxFactor": 1.9,
+            "labels": {
+                "x": r"$V_{\mathrm{EDTA}}\ /\ \mathrm{mL}$",
+                "y": r"$\mathrm{p}[\mathrm{Ca}^{2+}]$",
+                "xPlain": "V(EDTA) / mL",
+                "yPlain": "pCa",
+                "title": "Curva de Titulación — Complejometría EDTA",
+                "sampleLabel": r"$V_{\mathrm{muestra}}$",
+                "reaction": r"$\mathrm{Ca}^{2+}\ +\ \mathrm{HY}^{3-}\ \longrightarrow\ \mathrm{CaY}^{2-}\ +\ \mathrm{H}^{+}$",
+            },
+        },
     },
 
     # Stages 6-7: Calculation
     "calculation": {
         "formulaText": "Dureza (ppm CaCO₃) = (V_EDTA × M_EDTA × PM_CaCO₃ × 1000) / V_muestra",
         "formulaLatex": r"\text{Dureza} = \frac{V_{EDTA} \times M_{EDTA} \times PM_{CaCO_3} \times 1000}{V_{muestra}}",
+        "expression": "V_EDTA * M_EDTA * PM_CaCO3 * 1000 / V_muestra",
         "variables": [
             {"symbol": "V_EDTA", "name": "Volumen de EDTA gastado", "unit": "mL", "source": "titration_result", "description": "Lectura de la bureta al punto final"},
             {"symbol": "M_EDTA", "name": "Molaridad del EDTA", "unit": "mol/L", "source": "constant", "value": 0.01},
@@ -5,7 +5,7 @@ and loading practice configurations.
 Each practice is defined in data/practices/ and registered here.
 """
 
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 # ---------------------------------------------------------------------------
 # Internal registry – maps practice_id (int) to its configuration dict.
@@ -14,14 +14,50 @@ from typing import Dict, List, Optional
 # ---------------------------------------------------------------------------
 _PRACTICES: Dict[int, dict] = {}
 
+# ---------------------------------------------------------------------------
+# Compilers turn part of a practice config into a ready-to-call artefact
+# (e.g. a formula evaluator) once, when the practice is registered, instead
+# of re-interpreting the config on every request.  A compiler returns
+# ``None`` for practices it does not apply to.
+# ---------------------------------------------------------------------------
+_COMPILERS: Dict[str, Callable[[dict], Any]] = {}
+_COMPILED: Dict[Tuple[int, str], Any] = {}
+
+
+def _compile(practice: dict, name: str, compiler: Callable[[dict], Any]) -> None:
+    artefact = compiler(practice)
+    if artefact is None:
+        _COMPILED.pop((practice["id"], name), None)
+    else:
+        _COMPILED[(practice["id"], name)] = artefact
+
 
 def register_practice(practice: dict) -> None:
     """Register a practice configuration dict.
 
     The dict **must** contain at least ``id`` (int) and ``name`` (str).
+    Every registered compiler is run on it.
     """
     pid = practice["id"]
     _PRACTICES[pid] = practice
+    for name, compiler in _COMPILERS.items():
+        _compile(practice, name, compiler)
+
+
+def register_compiler(name: str, compiler: Callable[[dict], Any]) -> None:
+    """Register *compiler* under *name* and run it on every known practice.
+
+    Practices registered later are compiled as they arrive, so import
+    order between practices and compilers does not matter.
+    """
+    _COMPILERS[name] = compiler
+    for practice in _PRACTICES.values():
+        _compile(practice, name, compiler)
+
+
+def get_compiled(practice_id: int, name: str) -> Optional[Any]:
+    """Return the artefact compiler *name* built for *practice_id*, or ``None``."""
+    return _COMPILED.get((practice_id, name))
 
 
 def get_all_practices() -> List[dict]:
@@ -1,14 +1,65 @@
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
 from typing import AsyncGenerator
 
 from config import settings
+from migrations import run_migrations
+from services.query_log import instrument
+
+
+def configure_sqlite(engine, pragmas: dict) -> None:
+    """Run ``PRAGMA name=value`` for each of *pragmas* on every new connection."""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def database_url(url: str) -> URL:
+    """Parse *url*, giving plain ``postgres://`` / ``postgresql://`` URLs the asyncpg driver."""
+    parsed = make_url(url)
+    if parsed.drivername in ("postgres", "postgresql"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    if parsed.drivername == "postgresql+asyncpg" and "prepared_statement_cache_size" not in parsed.query:
+        parsed = parsed.update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+        )
+    return parsed
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    future=True,
-)
+
+def engine_options(url: URL) -> dict:
+    """Keyword arguments for ``create_async_engine`` on *url*'s backend."""
+    options = {"echo": settings.SQL_ECHO, "future": True}
+    if url.get_backend_name() == "postgresql":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+        if url.get_driver_name() == "asyncpg":
+            cache_size = int(url.query.get("prepared_statement_cache_size", settings.DB_STATEMENT_CACHE_SIZE))
+            options["connect_args"] = {
+                "statement_cache_size": cache_size,
+                "server_settings": {"application_name": settings.APP_NAME},
+            }
+    return options
+
+
+_url = database_url(settings.DATABASE_URL)
+engine = create_async_engine(_url, **engine_options(_url))
+
+if engine.dialect.name == "sqlite":
+    configure_sqlite(engine, settings.sqlite_pragmas)
+instrument(engine)
 
 async_session = async_sessionmaker(
     engine,
@@ -19,6 +70,18 @@ async_session = async_sessionmaker(
 Base = declarative_base()
 
 
+def dialect_insert(bind, table):
+    """``INSERT`` for *table* with ``on_conflict_do_update`` (SQLite or PostgreSQL)."""
+    name = bind.dialect.name
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {name}")
+    return insert(table)
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """FastAPI dependency that provides an async database session."""
     async with async_session() as session:
@@ -33,7 +96,8 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 
 
 async def init_db() -> None:
-    """Create all database tables."""
+    """Create missing tables, then apply pending schema migrations."""
     import models  # noqa: F401  -- ensure all models are loaded before creating tables
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
@@ -1,3 +1,5 @@
+import importlib
+import threading
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -5,13 +7,29 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings
 from database import init_db
+from services.render_pool import render_pool
+from services.titration_journal import titration_journal
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Application lifespan: initialise DB on startup."""
+    """Application lifespan: initialise DB and curve workers on startup."""
     await init_db()
-    yield
+    render_pool.start(warm=settings.CURVE_WARMUP)
+    if settings.CURVE_WARMUP:
+        # numpy is only needed by the curve endpoints; import it off the
+        # startup path so health checks answer before it is loaded.
+        threading.Thread(
+            target=importlib.import_module,
+            args=("services.curve_engine",),
+            name="curve-warmup",
+            daemon=True,
+        ).start()
+    try:
+        yield
+    finally:
+        await titration_journal.flush()
+        render_pool.shutdown()
 
 
 app = FastAPI(
@@ -39,11 +57,11 @@ _router_modules = [
     ("routers.sessions", "router", "/api"),
     ("routers.calculations", "router", "/api"),
     ("routers.teacher", "router", "/api"),
+    ("routers.admin", "router", "/api"),
 ]
 
 for module_path, attr_name, prefix in _router_modules:
     try:
-        import importlib
         mod = importlib.import_module(module_path)
         app.include_router(getattr(mod, attr_name), prefix=prefix)
     except (ModuleNotFoundError, AttributeError):
@@ -0,0 +1,197 @@
+"""
+Versioned schema migrations.
+
+``init_db`` creates missing tables with ``create_all`` and then calls
+``run_migrations``, which applies, in order, every migration newer than the
+highest version recorded in the ``schema_migrations`` table and records
+each one there.  Databases created by older versions are upgraded in place
+on the next startup; on a fresh database the migrations find their columns
+and indexes already created from the models and only record themselves.
+
+To change the schema: update the model, then append a ``Migration`` with
+the next version whose ``upgrade`` brings an existing database to the same
+state.  Never edit or reorder a migration that has been released.
+
+Apply and list them by hand (cwd: lab-simulator/backend)::
+
+    python -m migrations
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, bindparam, func, inspect, select, text,
+)
+
+logger = logging.getLogger("lab_simulator.migrations")
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable   # (sync Connection) → None
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _add_column(conn, table: str, name: str, type_sql: str) -> None:
+    if name not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {type_sql}")
+
+
+def _create_index(conn, name: str, table: str, columns: str, unique: bool = False) -> None:
+    conn.exec_driver_sql(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+    )
+
+
+# ── Migrations ────────────────────────────────────────────────────────────────
+
+def _stored_report(conn) -> None:
+    _add_column(conn, "practice_sessions", "report", "JSON")
+
+
+def _hot_path_indexes(conn) -> None:
+    _create_index(conn, "ix_practice_results_session_id", "practice_results", "session_id")
+    _create_index(conn, "ix_students_section_id_student_code", "students", "section_id, student_code")
+    _create_index(conn, "ix_section_practices_section_id_created_at", "section_practices",
+                  "section_id, created_at")
+    _create_index(conn, "ix_practice_sessions_practice_id_status", "practice_sessions",
+                  "practice_id, status")
+    # Sessions are tied to a section only by student name: the section scores
+    # and the section curve export filter on student_name IN (section's names)
+    _create_index(conn, "ix_practice_sessions_student_name", "practice_sessions", "student_name")
+
+
+def _unique_grades(conn) -> None:
+    # Concurrent upserts could insert the same (student, practice) grade
+    # twice; keep one row of each pair before making the pair unique.
+    # Grades carry no timestamps, so the kept row is the one with the
+    # highest score (a graded row over an empty one); the others are
+    # logged so a teacher can check them.
+    rows = conn.exec_driver_sql(
+        "SELECT g.id, g.student_id, g.section_practice_id, g.score FROM grades g"
+        " JOIN (SELECT student_id, section_practice_id FROM grades"
+        "       GROUP BY student_id, section_practice_id HAVING COUNT(*) > 1) d"
+        " ON g.student_id = d.student_id AND g.section_practice_id = d.section_practice_id"
+    ).all()
+    pairs = defaultdict(list)
+    for row in rows:
+        pairs[(row.student_id, row.section_practice_id)].append(row)
+    for (student_id, section_practice_id), grades in pairs.items():
+        keep = max(grades, key=lambda g: (g.score is not None, g.score or 0.0, g.id))
+        dropped = [g for g in grades if g is not keep]
+        logger.warning(
+            "grades: student %s, practice %s: kept score %s, removed duplicates with scores %s",
+            student_id, section_practice_id, keep.score, [g.score for g in dropped],
+        )
+        conn.execute(
+            text("DELETE FROM grades WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": [g.id for g in dropped]},
+        )
+    _create_index(conn, "ux_grades_student_id_section_practice_id", "grades",
+                  "student_id, section_practice_id", unique=True)
+
+
+def _unique_results(conn) -> None:
+    # Reports generated concurrently, or before results were replaced
+    # instead of appended, can leave several rows for one criterion.  Keep
+    # the row that matches the session's stored report (what the student
+    # was shown); without one, the highest score, as for grades.
+    rows = conn.exec_driver_sql(
+        "SELECT r.id, r.session_id, r.criterion_id, r.score, s.report FROM practice_results r"
+        " JOIN (SELECT session_id, criterion_id FROM practice_results"
+        "       GROUP BY session_id, criterion_id HAVING COUNT(*) > 1) d"
+        " ON r.session_id = d.session_id AND r.criterion_id = d.criterion_id"
+        " LEFT JOIN practice_sessions s ON s.id = r.session_id"
+    ).all()
+    pairs = defaultdict(list)
+    for row in rows:
+        pairs[(row.session_id, row.criterion_id)].append(row)
+    for (session_id, criterion_id), results in pairs.items():
+        report = results[0].report
+        if isinstance(report, str):
+            report = json.loads(report)
+        reported = {c["criterion_id"]: c["score"] for c in (report or {}).get("criteria", [])}
+        keep = max(results, key=lambda r: (r.score == reported.get(criterion_id),
+                                           r.score is not None, r.score or 0.0, r.id))
+        dropped = [r for r in results if r is not keep]
+        logger.warning(
+            "practice_results: session %s, criterion %s: kept score %s, removed duplicates with scores %s",
+            session_id, criterion_id, keep.score, [r.score for r in dropped],
+        )
+        conn.execute(
+            text("DELETE FROM practice_results WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": [r.id for r in dropped]},
+        )
+    _create_index(conn, "ux_practice_results_session_id_criterion_id", "practice_results",
+                  "session_id, criterion_id", unique=True)
+    # The unique index leads with session_id and replaces this one
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_practice_results_session_id")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "practice_sessions.report (stored evaluation report)", _stored_report),
+    Migration(2, "indexes for the session, result, student and section lookups", _hot_path_indexes),
+    Migration(3, "unique grade per student and section practice", _unique_grades),
+    Migration(4, "unique result per session and criterion", _unique_results),
+]
+
+
+# ── Runner ────────────────────────────────────────────────────────────────────
+
+def current_version(conn) -> int:
+    return conn.execute(select(func.coalesce(func.max(schema_migrations.c.version), 0))).scalar()
+
+
+def run_migrations(conn) -> List[Migration]:
+    """Apply pending migrations on sync connection *conn*; return those applied.
+
+    Meant for ``AsyncConnection.run_sync`` inside ``engine.begin()``.
+    """
+    _metadata.create_all(conn)
+    version = current_version(conn)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        migration.upgrade(conn)
+        conn.execute(schema_migrations.insert().values(
+            version=migration.version,
+            description=migration.description,
+            applied_at=datetime.utcnow(),
+        ))
+        applied.append(migration)
+    return applied
+
+
+def main() -> None:
+    from database import init_db, engine
+
+    async def run():
+        await init_db()
+        async with engine.connect() as conn:
+            rows = (await conn.execute(select(schema_migrations).order_by(schema_migrations.c.version))).all()
+        await engine.dispose()
+        return rows
+
+    for version, description, applied_at in asyncio.run(run()):
+        print(f"{version:>3}  {applied_at:%Y-%m-%d %H:%M}  {description}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from models.section import Section
 from models.student import Student
 from models.section_practice import SectionPractice
 from models.grade import Grade
+from models.titration_event import TitrationEvent
 
 __all__ = [
     "PracticeSession",
@@ -12,4 +13,5 @@ __all__ = [
     "Student",
     "SectionPractice",
     "Grade",
+    "TitrationEvent",
 ]
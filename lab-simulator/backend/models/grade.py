@@ -1,6 +1,6 @@
 from uuid import uuid4
 
-from sqlalchemy import Column, String, Float, ForeignKey
+from sqlalchemy import Column, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -8,6 +8,9 @@ from database import Base
 
 class Grade(Base):
     __tablename__ = "grades"
+    __table_args__ = (
+        Index("ux_grades_student_id_section_practice_id", "student_id", "section_practice_id", unique=True),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     student_id = Column(String, ForeignKey("students.id"), nullable=False)
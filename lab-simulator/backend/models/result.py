@@ -1,6 +1,6 @@
 from uuid import uuid4
 
-from sqlalchemy import Column, String, Float, ForeignKey
+from sqlalchemy import Column, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -8,6 +8,10 @@ from database import Base
 
 class PracticeResult(Base):
     __tablename__ = "practice_results"
+    __table_args__ = (
+        # Also serves the session_id lookups (leading column)
+        Index("ux_practice_results_session_id_criterion_id", "session_id", "criterion_id", unique=True),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     session_id = Column(String, ForeignKey("practice_sessions.id"))
@@ -1,7 +1,7 @@
 from uuid import uuid4
 from datetime import datetime
 
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -9,6 +9,9 @@ from database import Base
 
 class SectionPractice(Base):
     __tablename__ = "section_practices"
+    __table_args__ = (
+        Index("ix_section_practices_section_id_created_at", "section_id", "created_at"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     section_id = Column(String, ForeignKey("sections.id"), nullable=False)
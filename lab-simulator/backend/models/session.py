@@ -1,7 +1,7 @@
 from uuid import uuid4
 from datetime import datetime
 
-from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, Text
+from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, Text, JSON, Index
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -9,6 +9,12 @@ from database import Base
 
 class PracticeSession(Base):
     __tablename__ = "practice_sessions"
+    __table_args__ = (
+        Index("ix_practice_sessions_practice_id_status", "practice_id", "status"),
+        # GET /teacher/sections/{code}/scores and POST /teacher/curves/export
+        # find a section's sessions by student_name IN (its students' names)
+        Index("ix_practice_sessions_student_name", "student_name"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     student_name = Column(String, nullable=True)
@@ -39,6 +45,9 @@ class PracticeSession(Base):
     # Scoring fields
     total_score = Column(Float, nullable=True)
     feedback = Column(Text, nullable=True)
+    # Evaluation report as served by GET /sessions/{id}/report; cleared
+    # whenever a field the rubric reads changes, so it is rebuilt on demand.
+    report = Column(JSON(none_as_null=True), nullable=True)
 
     # Relationships
     results = relationship("PracticeResult", back_populates="session")
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
+
+from database import Base
+
+
+class TitrationEvent(Base):
+    """One drop, stream step or reset applied to a session's server-side burette."""
+
+    __tablename__ = "titration_events"
+    __table_args__ = (
+        Index("ix_titration_events_session_id_id", "session_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String, ForeignKey("practice_sessions.id"), nullable=False)
+    kind = Column(String, nullable=False)        # drop | stream | reset
+    amount = Column(Float, nullable=False)       # mL added (0 for a reset)
+    volume = Column(Float, nullable=False)       # burette volume after the event
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from data.registry import get_practice
+from schemas.admin import RescoreRequest
+from services.curve_cache import curve_cache
+from services.query_log import query_stats
+from services.rescoring import get_job, running_job, start_rescore_job
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+# ── Rescoring ─────────────────────────────────────────────────────────────
+
+@router.post("/rescore", status_code=202)
+async def start_rescore(body: RescoreRequest):
+    """Start rescoring completed sessions in the background.
+
+    Poll ``GET /admin/rescore/{job_id}`` for progress.  Only one job runs
+    at a time.
+    """
+    if body.practice_id is not None and get_practice(body.practice_id) is None:
+        raise HTTPException(status_code=404, detail="Práctica no encontrada")
+    if running_job() is not None:
+        raise HTTPException(status_code=409, detail="Ya hay un recálculo en curso")
+
+    job = start_rescore_job(body.practice_id, body.chunk_size, body.dry_run)
+    return job.as_dict()
+
+
+@router.get("/rescore/{job_id}")
+async def rescore_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Recálculo no encontrado")
+    return job.as_dict()
+
+
+# ── SQL statistics ────────────────────────────────────────────────────────
+
+@router.get("/query-stats")
+async def get_query_stats(limit: int = Query(20, ge=1, le=200)):
+    """Statements with the most total database time since startup (or the last reset)."""
+    return {"statements": query_stats.top(limit)}
+
+
+@router.delete("/query-stats", status_code=204)
+async def reset_query_stats():
+    query_stats.reset()
+
+
+# ── Curve cache ───────────────────────────────────────────────────────────
+
+@router.get("/curve-cache-stats")
+async def get_curve_cache_stats():
+    """Entries, bytes and hit/miss/eviction counts of this process's rendered-curve cache."""
+    return curve_cache.stats()
@@ -1,6 +1,8 @@
+from collections import defaultdict
+
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 import data.practices  # noqa: F401
 from database import get_db
@@ -8,9 +10,13 @@ from models.session import PracticeSession
 from schemas.calculation import (
     CalculationValidateRequest, CalculationValidateResponse,
     ExpectedVolumeRequest, ExpectedVolumeResponse,
+    ExpectedVolumeRangeRequest, ExpectedVolumeRangeResponse,
+    CalculationBatchRequest, CalculationBatchResponse,
+)
+from services.calculation_engine import (
+    calculation_feedback, validate_calculations_batch, validate_student_calculation,
 )
-from services.calculation_engine import validate_student_calculation
-from services.titration_engine import get_expected_volume
+from services.titration_engine import get_expected_volume, get_expected_volume_range
 
 router = APIRouter(prefix="/calculations", tags=["calculations"])
 
@@ -35,6 +41,7 @@ async def validate_calculation(body: CalculationValidateRequest, db: AsyncSessio
             recorded_volume=session.recorded_volume,
             measured_value=session.measured_value,
             student_result=body.student_result,
+            uncertainty=body.uncertainty,
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -43,11 +50,102 @@ async def validate_calculation(body: CalculationValidateRequest, db: AsyncSessio
     session.student_calculation = body.student_result
     session.correct_calculation = calc_result["correct_result"]
     session.percent_error = calc_result["percent_error"]
+    session.report = None
     await db.flush()
 
     return calc_result
 
 
+@router.post("/validate-batch", response_model=CalculationBatchResponse)
+async def validate_calculation_batch(body: CalculationBatchRequest, db: AsyncSession = Depends(get_db)):
+    """Validate many (session_id, student_result) pairs at once.
+
+    Sessions are loaded with a single query and evaluated per practice as
+    NumPy arrays; every valid item is written back in one bulk UPDATE.
+    Items that cannot be validated carry an ``error`` and are left untouched;
+    when a session appears more than once, its last item is the one applied.
+    """
+    items = body.items
+    result = await db.execute(
+        select(
+            PracticeSession.id,
+            PracticeSession.practice_id,
+            PracticeSession.recorded_volume,
+            PracticeSession.measured_value,
+        ).where(PracticeSession.id.in_({item.session_id for item in items}))
+    )
+    sessions = {row.id: row for row in result}
+
+    results = [{"session_id": item.session_id, "student_result": item.student_result} for item in items]
+    last = {item.session_id: i for i, item in enumerate(items)}
+    by_practice = defaultdict(list)
+    for i, item in enumerate(items):
+        session = sessions.get(item.session_id)
+        if last[item.session_id] != i:
+            results[i]["error"] = "Sesión repetida en el lote; se aplica su último resultado"
+        elif session is None:
+            results[i]["error"] = "Sesión no encontrada"
+        elif session.recorded_volume is None:
+            results[i]["error"] = "No se ha registrado lectura de bureta"
+        elif session.measured_value is None:
+            results[i]["error"] = "No se ha registrado medición de muestra"
+        else:
+            by_practice[session.practice_id].append(i)
+
+    updates = []
+    for practice_id, indices in by_practice.items():
+        try:
+            batch = validate_calculations_batch(
+                practice_id,
+                [sessions[items[i].session_id].recorded_volume for i in indices],
+                [sessions[items[i].session_id].measured_value for i in indices],
+                [items[i].student_result for i in indices],
+            )
+        except ValueError as e:
+            for i in indices:
+                results[i]["error"] = str(e)
+            continue
+
+        tolerance = batch["tolerance"]
+        columns = zip(
+            indices,
+            batch["correct_result"].tolist(),
+            batch["theoretical_result"].tolist(),
+            batch["percent_error"].tolist(),
+            batch["is_within_tolerance"].tolist(),
+            batch["is_computable"].tolist(),
+        )
+        for i, correct, theoretical, percent_error, is_within, computable in columns:
+            if not computable:
+                results[i]["error"] = "No se puede calcular el resultado con la medición registrada"
+                continue
+            student = items[i].student_result
+            results[i].update(
+                correct_result=correct,
+                theoretical_result=theoretical,
+                student_result=round(student, 2),
+                percent_error=percent_error,
+                is_within_tolerance=is_within,
+                feedback=calculation_feedback(student, theoretical, percent_error, tolerance, is_within),
+            )
+            updates.append({
+                "id": items[i].session_id,
+                "student_calculation": student,
+                "correct_calculation": correct,
+                "percent_error": percent_error,
+                "report": None,
+            })
+
+    if updates:
+        await db.execute(update(PracticeSession), updates)
+
+    return {
+        "validated": len(updates),
+        "failed": len(items) - len(updates),
+        "results": results,
+    }
+
+
 @router.post("/expected-volume", response_model=ExpectedVolumeResponse)
 async def calculate_expected(body: ExpectedVolumeRequest):
     try:
@@ -56,3 +154,18 @@ async def calculate_expected(body: ExpectedVolumeRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
     return result
+
+
+@router.post("/expected-volume/range", response_model=ExpectedVolumeRangeResponse)
+async def calculate_expected_range(body: ExpectedVolumeRangeRequest):
+    """Expected volumes for a whole measurement range in one response.
+
+    Without ``start``/``stop``/``step`` the practice's slider range is
+    returned at the instrument resolution.
+    """
+    try:
+        return get_expected_volume_range(
+            body.practice_id, body.sample_id, body.start, body.stop, body.step,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from typing import Literal
 import data.practices  # noqa: F401 — triggers registration
 
 from data.registry import get_all_practices, get_practice
 from data.catalog import INSTRUMENTS, REAGENTS, SAMPLES, DISTRACTORS
+from services.color_lut import get_color_lut
 
 router = APIRouter(prefix="/practices", tags=["practices"])
 
@@ -34,6 +36,27 @@ async def get_practice_detail(practice_id: int):
     return practice
 
 
+@router.get("/{practice_id}/color-lut")
+async def get_practice_color_lut(
+    practice_id: int,
+    encoding: Literal['rgb', 'hex'] = Query('rgb'),
+):
+    """Titration color table sampled evenly over ``[start, stop]`` progress.
+
+    ``encoding=rgb`` returns ``colors`` as base64 of ``size`` packed RGB
+    triplets (decode with ``Uint8Array``); ``hex`` returns a list of
+    ``#rrggbb`` strings.  Entry ``i`` is the color at progress
+    ``start + i * (stop - start) / (size - 1)``; progress outside the
+    range takes the first or last entry.
+    """
+    if get_practice(practice_id) is None:
+        raise HTTPException(status_code=404, detail="Práctica no encontrada")
+    lut = get_color_lut(practice_id)
+    if lut is None:
+        raise HTTPException(status_code=404, detail="La práctica no tiene transiciones de color")
+    return lut.to_dict(encoding)
+
+
 @router.get("/{practice_id}/materials")
 async def get_practice_materials(practice_id: int):
     practice = get_practice(practice_id)
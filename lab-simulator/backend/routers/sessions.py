@@ -1,23 +1,32 @@
+import asyncio
+import base64
+import sys
+from collections import OrderedDict
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import Literal
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from typing import Dict, Literal, Optional
 from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 import data.practices  # noqa: F401
+from config import settings
 from database import get_db
 from models.session import PracticeSession
-from models.result import PracticeResult
 from data.registry import get_practice
 from schemas.session import (
     SessionCreate, SessionResponse, StageUpdate,
-    MeasurementUpdate, MaterialsUpdate, TitrationUpdate,
+    MeasurementUpdate, MaterialsUpdate, TitrationUpdate, SessionPatch,
 )
 from services.titration_engine import get_expected_volume
+from services.titration_journal import titration_journal
 from services.report_generator import generate_report
-from services.titration_curve import generate_titration_curve
+from services.rescoring import save_results
+from services.render_pool import RenderPoolBusy
+from services.curve_cache import normalize_curve_inputs
+from services.curve_export import render_curve_cached
+from services.curve_output import curve_etag, etag_matches, negotiate_variant
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
@@ -70,6 +79,7 @@ async def create_session(body: SessionCreate, db: AsyncSession = Depends(get_db)
     )
     db.add(session)
     await db.flush()
+    _remember_practice(session.id, session.practice_id)
     return _session_to_dict(session)
 
 
@@ -84,63 +94,88 @@ async def get_session(session_id: str, db: AsyncSession = Depends(get_db)):
     return _session_to_dict(session)
 
 
-@router.put("/{session_id}/stage")
-async def update_stage(session_id: str, body: StageUpdate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(PracticeSession).where(PracticeSession.id == session_id)
-    )
-    session = result.scalar_one_or_none()
-    if session is None:
+# ── Updates ───────────────────────────────────────────────────────────────────
+#
+# Each update is one ``UPDATE practice_sessions ... WHERE id = :id RETURNING``
+# statement: no SELECT first, and an empty result means the session does not
+# exist.  Values that depend on the session's practice (expected volume,
+# materials check) need its ``practice_id``, which never changes once the
+# session is created: it is cached per session id, so only the first such
+# update of a session in this process reads it first.
+
+_sessions = PracticeSession.__table__
+_SESSION_COLUMNS = [c for c in _sessions.c if c.name != "report"]
+
+_practice_ids: "OrderedDict[str, int]" = OrderedDict()
+
+
+def _remember_practice(session_id: str, practice_id: int) -> None:
+    _practice_ids[session_id] = practice_id
+    if len(_practice_ids) > settings.SESSION_PRACTICE_CACHE_SIZE:
+        _practice_ids.popitem(last=False)
+
+
+async def _practice_id(db: AsyncSession, session_id: str) -> int:
+    """The session's ``practice_id`` (404 if the session does not exist)."""
+    practice_id = _practice_ids.get(session_id)
+    if practice_id is None:
+        practice_id = (await db.execute(
+            select(_sessions.c.practice_id).where(_sessions.c.id == session_id)
+        )).scalar_one_or_none()
+        if practice_id is None:
+            raise HTTPException(status_code=404, detail="Sesión no encontrada")
+        _remember_practice(session_id, practice_id)
+    return practice_id
+
+
+async def _update_session(db: AsyncSession, session_id: str, values: dict):
+    """Apply *values* to the session and return its updated row (404 if missing)."""
+    stmt = update(_sessions).where(_sessions.c.id == session_id).values(**values)
+    if db.bind.dialect.update_returning:
+        row = (await db.execute(stmt.returning(*_SESSION_COLUMNS))).first()
+    else:
+        # SQLite before 3.35 has no RETURNING
+        result = await db.execute(stmt)
+        row = None
+        if result.rowcount:
+            row = (await db.execute(
+                select(*_SESSION_COLUMNS).where(_sessions.c.id == session_id)
+            )).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    return row
 
-    session.current_stage = body.stage
-
-    if body.data:
-        if "assembly_correct" in body.data:
-            session.assembly_correct = body.data["assembly_correct"]
 
-    await db.flush()
-    return _session_to_dict(session)
+def _stage_values(body: StageUpdate) -> dict:
+    values = {"current_stage": body.stage}
+    if body.data and "assembly_correct" in body.data:
+        values["assembly_correct"] = body.data["assembly_correct"]
+        values["report"] = None
+    return values
 
 
-@router.put("/{session_id}/measurement")
-async def update_measurement(session_id: str, body: MeasurementUpdate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(PracticeSession).where(PracticeSession.id == session_id)
-    )
-    session = result.scalar_one_or_none()
-    if session is None:
-        raise HTTPException(status_code=404, detail="Sesión no encontrada")
-
-    session.measured_value = body.value
-    session.measured_unit = body.unit
+def _measurement_values(body: MeasurementUpdate, practice_id: int) -> dict:
+    values = {
+        "measured_value": body.value,
+        "measured_unit": body.unit,
+        "report": None,
+    }
     if body.sample_id is not None:
-        session.sample_id = body.sample_id
+        values["sample_id"] = body.sample_id
 
-    # Recalculate expected volume (pass sample_id for per-sample volume tables)
-    try:
-        vol_result = get_expected_volume(session.practice_id, body.value, body.sample_id)
-        session.expected_volume = vol_result["expected_volume"]
-    except Exception:
-        pass
-
-    await db.flush()
-    return _session_to_dict(session)
-
-
-@router.put("/{session_id}/materials")
-async def update_materials(session_id: str, body: MaterialsUpdate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(PracticeSession).where(PracticeSession.id == session_id)
-    )
-    session = result.scalar_one_or_none()
-    if session is None:
-        raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    # Expected volume for this measurement (pass sample_id for per-sample
+    # volume tables); left as it was for practices without a titration
+    practice = get_practice(practice_id)
+    if practice and practice.get("measurement") and practice.get("titration"):
+        try:
+            values["expected_volume"] = get_expected_volume(practice_id, body.value, body.sample_id)["expected_volume"]
+        except Exception:
+            pass
+    return values
 
-    practice = get_practice(session.practice_id)
-    if practice is None:
-        raise HTTPException(status_code=404, detail="Práctica no encontrada")
 
+def _check_materials(practice: dict, body: MaterialsUpdate):
+    """(all correct, error messages) for a materials selection."""
     required_inst = set(practice.get("requiredInstruments", []))
     required_reag = set(practice.get("requiredReagents", []))
     selected_inst = set(body.instruments)
@@ -148,10 +183,6 @@ async def update_materials(session_id: str, body: MaterialsUpdate, db: AsyncSess
 
     inst_correct = selected_inst == required_inst
     reag_correct = selected_reag == required_reag
-    all_correct = inst_correct and reag_correct
-
-    session.materials_correct = all_correct
-    await db.flush()
 
     errors = []
     if not inst_correct:
@@ -168,78 +199,366 @@ async def update_materials(session_id: str, body: MaterialsUpdate, db: AsyncSess
             errors.append(f"Faltan reactivos: {', '.join(missing_reag)}")
         if extra_reag:
             errors.append(f"Reactivos incorrectos: {', '.join(extra_reag)}")
+    return inst_correct and reag_correct, errors
+
+
+def _materials_values(body: MaterialsUpdate, practice_id: int) -> dict:
+    practice = get_practice(practice_id)
+    if practice is None:
+        raise HTTPException(status_code=404, detail="Práctica no encontrada")
+    return {"materials_correct": _check_materials(practice, body)[0], "report": None}
 
-    resp = _session_to_dict(session)
-    resp["errors"] = errors
+
+def _materials_response(row, body: MaterialsUpdate) -> dict:
+    practice = get_practice(row.practice_id)
+    if practice is None:
+        raise HTTPException(status_code=404, detail="Práctica no encontrada")
+    resp = _session_to_dict(row)
+    resp["errors"] = _check_materials(practice, body)[1]
     return resp
 
 
+def _titration_values(body: TitrationUpdate) -> dict:
+    return {"recorded_volume": body.recorded_volume, "report": None}
+
+
+@router.put("/{session_id}/stage")
+async def update_stage(session_id: str, body: StageUpdate, db: AsyncSession = Depends(get_db)):
+    row = await _update_session(db, session_id, _stage_values(body))
+    return _session_to_dict(row)
+
+
+@router.put("/{session_id}/measurement")
+async def update_measurement(session_id: str, body: MeasurementUpdate, db: AsyncSession = Depends(get_db)):
+    values = _measurement_values(body, await _practice_id(db, session_id))
+    row = await _update_session(db, session_id, values)
+    # The burette state was built for the previous measurement
+    await _empty_burette(db, session_id)
+    return _session_to_dict(row)
+
+
+@router.put("/{session_id}/materials")
+async def update_materials(session_id: str, body: MaterialsUpdate, db: AsyncSession = Depends(get_db)):
+    values = _materials_values(body, await _practice_id(db, session_id))
+    row = await _update_session(db, session_id, values)
+    return _materials_response(row, body)
+
+
 @router.put("/{session_id}/titration")
 async def update_titration(session_id: str, body: TitrationUpdate, db: AsyncSession = Depends(get_db)):
+    row = await _update_session(db, session_id, _titration_values(body))
+    return _session_to_dict(row)
+
+
+@router.patch("/{session_id}")
+async def patch_session(session_id: str, body: SessionPatch, db: AsyncSession = Depends(get_db)):
+    """Apply several of the updates above in a single statement.
+
+    Any combination of ``stage`` (with ``data``), ``measurement``,
+    ``materials`` and ``titration``, with the same bodies as their ``PUT``
+    endpoints.  ``errors`` is included when ``materials`` is given.
+    """
+    values = {}
+    if body.stage is not None:
+        values.update(_stage_values(body.stage))
+    if body.measurement is not None or body.materials is not None:
+        practice_id = await _practice_id(db, session_id)
+        if body.measurement is not None:
+            values.update(_measurement_values(body.measurement, practice_id))
+        if body.materials is not None:
+            values.update(_materials_values(body.materials, practice_id))
+    if body.titration is not None:
+        values.update(_titration_values(body.titration))
+    if not values:
+        raise HTTPException(status_code=400, detail="No hay cambios que aplicar")
+
+    row = await _update_session(db, session_id, values)
+    if body.measurement is not None:
+        await _empty_burette(db, session_id)
+    if body.materials is not None:
+        return _materials_response(row, body.materials)
+    return _session_to_dict(row)
+
+
+# ── Server-side burette ──────────────────────────────────────────────────────
+
+def _titration_store():
+    # Imported here so numpy stays off the API cold-start path.
+    from services.titration_state import titration_store
+    return titration_store
+
+
+async def _empty_burette(db: AsyncSession, session_id: str) -> None:
+    """Forget the session's burette, if it ever had one.
+
+    The store is only consulted once this process has loaded it, so saving
+    a measurement never imports numpy, and a reset is journaled only over
+    additions that are not already reset.
+    """
+    module = sys.modules.get("services.titration_state")
+    if module is not None:
+        module.titration_store.discard(session_id)
+    if await titration_journal.needs_reset(db, session_id):
+        titration_journal.record_reset(session_id)
+
+
+# Burette loads in progress, by session id; concurrent first requests for a
+# session wait for the one load instead of replaying the journal again over
+# additions it has already applied.
+_loading: Dict[str, asyncio.Future] = {}
+
+
+async def _open_titration(session_id: str, db: AsyncSession, restart: bool = False):
+    """Return the burette store with *session_id* open, loading it on first use.
+
+    A session not open in this process (restart, eviction, another worker)
+    resumes from the burette journal; ``restart`` empties it instead.
+    """
+    store = _titration_store()
+    while (loading := _loading.get(session_id)) is not None:
+        await loading
+    if session_id in store and not restart:
+        return store
+
+    loading = asyncio.get_running_loop().create_future()
+    _loading[session_id] = loading
+    try:
+        await _load_titration(store, session_id, db, restart)
+    finally:
+        del _loading[session_id]
+        loading.set_result(None)
+    return store
+
+
+async def _load_titration(store, session_id: str, db: AsyncSession, restart: bool) -> None:
     result = await db.execute(
-        select(PracticeSession).where(PracticeSession.id == session_id)
+        select(
+            PracticeSession.practice_id,
+            PracticeSession.measured_value,
+            PracticeSession.sample_id,
+        ).where(PracticeSession.id == session_id)
     )
-    session = result.scalar_one_or_none()
-    if session is None:
+    row = result.one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    restored = None if restart else await titration_journal.replay(db, session_id)
+    try:
+        store.open(session_id, row.practice_id, row._mapping, restored)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if restart:
+        titration_journal.record_reset(session_id)
+
+
+async def _add_titrant(store, session_id: str, kind: str) -> dict:
+    try:
+        return await store.add(session_id, kind)
+    except KeyError:
+        # The burette was emptied (new measurement) while the drop was queued
+        raise HTTPException(status_code=409, detail="La bureta se reinició; vuelve a intentarlo")
 
-    session.recorded_volume = body.recorded_volume
-    await db.flush()
-    return _session_to_dict(session)
+
+@router.post("/{session_id}/titration/drop")
+async def titration_drop(session_id: str, db: AsyncSession = Depends(get_db)):
+    """Add one drop (``dropVolume``) and return the new burette state."""
+    store = await _open_titration(session_id, db)
+    return await _add_titrant(store, session_id, "drop")
+
+
+@router.post("/{session_id}/titration/stream")
+async def titration_stream(session_id: str, db: AsyncSession = Depends(get_db)):
+    """Add one stream step (``streamVolume``) and return the new burette state."""
+    store = await _open_titration(session_id, db)
+    return await _add_titrant(store, session_id, "stream")
+
+
+@router.get("/{session_id}/titration/state")
+async def titration_state(session_id: str, db: AsyncSession = Depends(get_db)):
+    store = await _open_titration(session_id, db)
+    return store.state(session_id)
+
+
+@router.post("/{session_id}/titration/reset")
+async def titration_reset(session_id: str, db: AsyncSession = Depends(get_db)):
+    """Empty the burette and start counting drops again."""
+    store = await _open_titration(session_id, db, restart=True)
+    return store.state(session_id)
 
 
 @router.get("/{session_id}/report")
 async def get_report(session_id: str, db: AsyncSession = Depends(get_db)):
+    """Evaluation report, generated once and then served as stored.
+
+    The first request completes the session and stores the report and its
+    per-criterion results; later ones are a single primary-key lookup.
+    Changing any scored field clears the stored report, so the next request
+    generates it again and replaces the session's results.
+    """
     result = await db.execute(
         select(PracticeSession).where(PracticeSession.id == session_id)
     )
     session = result.scalar_one_or_none()
     if session is None:
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    if session.report is not None:
+        return session.report
 
     practice = get_practice(session.practice_id)
     if practice is None:
         raise HTTPException(status_code=404, detail="Práctica no encontrada")
 
+    completed_at = datetime.utcnow()
     report = generate_report(session, practice)
-
-    # Save results to DB
-    for criterion in report["criteria"]:
-        pr = PracticeResult(
-            session_id=session_id,
-            criterion_id=criterion["criterion_id"],
-            criterion_label=criterion["criterion_label"],
-            score=criterion["score"],
-            max_score=criterion["max_score"],
-            feedback=criterion["feedback"],
-        )
-        db.add(pr)
+    report["completed_at"] = completed_at.isoformat()
+
+    # Upsert on (session, criterion): concurrent first requests update the
+    # same rows instead of adding a second set
+    await save_results(db, [
+        {
+            "session_id": session_id,
+            "criterion_id": criterion["criterion_id"],
+            "criterion_label": criterion["criterion_label"],
+            "score": criterion["score"],
+            "max_score": criterion["max_score"],
+            "feedback": criterion["feedback"],
+        }
+        for criterion in report["criteria"]
+    ])
 
     session.total_score = report["total_score"]
     session.feedback = report["overall_feedback"]
     session.status = "completed"
-    session.completed_at = datetime.utcnow()
+    session.completed_at = completed_at
+    session.report = report
 
     await db.flush()
     return report
 
 
+# Columns the curve image depends on; the curve endpoint reads nothing else.
+_CURVE_COLUMNS = (
+    PracticeSession.practice_id,
+    PracticeSession.recorded_volume,
+    PracticeSession.expected_volume,
+    PracticeSession.measured_value,
+    PracticeSession.sample_id,
+)
+
+
 @router.get("/{session_id}/titration-curve")
 async def get_titration_curve(
     session_id: str,
-    format: Literal['svg', 'png'] = Query('svg'),
+    format: Optional[Literal['svg', 'png', 'webp']] = Query(None),
+    dpi: Optional[int] = Query(None, ge=60, le=180),
+    text: bool = Query(True),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
 ):
+    """Curve image in the smallest representation the client accepts.
+
+    Without ``format`` the type is negotiated from ``Accept`` (compressed
+    SVG first, then WebP, then PNG). ``dpi`` lowers raster resolution and
+    ``text=false`` draws SVG labels as glyph outlines, for clients that must
+    render exactly without the fonts.
+
+    The strong ETag is computed from the session inputs before rendering,
+    so a matching ``If-None-Match`` is answered with 304 straight away.
+    """
     result = await db.execute(
-        select(PracticeSession).where(PracticeSession.id == session_id)
+        select(*_CURVE_COLUMNS).where(PracticeSession.id == session_id)
     )
-    session = result.scalar_one_or_none()
-    if session is None:
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada")
+
+    inputs = normalize_curve_inputs(row._mapping)
+    try:
+        variant = negotiate_variant(format, dpi, text, accept, accept_encoding)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    etag = curve_etag(row.practice_id, inputs, variant)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept, Accept-Encoding",
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        data = await render_curve_cached(row.practice_id, inputs, variant)
+    except RenderPoolBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado generando curvas, intenta de nuevo",
+            headers={"Retry-After": "2"},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if variant.encoding != 'identity':
+        headers["Content-Encoding"] = variant.encoding
+    return Response(content=data, media_type=variant.media_type, headers=headers)
+
+
+def _encode_series(values, encoding: str):
+    if encoding == 'f32':
+        return base64.b64encode(values.astype('<f4').tobytes()).decode('ascii')
+    return [round(float(v), 4) for v in values]
+
+
+@router.get("/{session_id}/titration-curve/data")
+async def get_titration_curve_data(
+    session_id: str,
+    points: Optional[int] = Query(None, ge=3, le=3000),
+    encoding: Literal['json', 'f32'] = Query('json'),
+    coated: Optional[bool] = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Curve arrays for client-side drawing.
+
+    ``encoding=f32`` returns ``volume``/``px`` as base64 little-endian
+    float32 buffers (decode with ``new Float32Array(...)``) instead of JSON
+    number lists.  ``coated=false`` lets a competing precipitate (AgCl in
+    Volhard) exchange with the titrant, to show the error it causes.
+    """
+    result = await db.execute(
+        select(*_CURVE_COLUMNS).where(PracticeSession.id == session_id)
+    )
+    row = result.one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
 
+    # Imported here so numpy stays off the API cold-start path.
+    from services.curve_engine import compute_titration_curve
+
+    inputs = normalize_curve_inputs(row._mapping)
+    inputs["coated"] = coated
     try:
-        data = generate_titration_curve(session.practice_id, _session_to_dict(session), fmt=format)
-        media_type = 'image/png' if format == 'png' else 'image/svg+xml'
-        return Response(content=data, media_type=media_type)
+        d = compute_titration_curve(row.practice_id, inputs, points=points)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
+
+    v_eq, recorded, tol = d['v_eq'], d['recorded'], d['tolerance']
+    error_ml = recorded - v_eq
+    return {
+        "practice_id": row.practice_id,
+        "encoding": encoding,
+        "points": len(d['volume']),
+        "volume": _encode_series(d['volume'], encoding),
+        "px": _encode_series(d['px'], encoding),
+        "x_label": d['x_label'],
+        "y_label": d['y_label'],
+        "x_range": [0.0, round(d['x_max'], 4)],
+        "y_range": [0.0, round(d['y_max'], 4)],
+        "equivalence": {"volume": round(v_eq, 4), "px": round(d['px_eq'], 4)},
+        "tolerance": {"min": round(v_eq - tol, 4), "max": round(v_eq + tol, 4), "width": tol},
+        "student": {
+            "volume": recorded,
+            "error_ml": round(error_ml, 4),
+            "error_pct": round(abs(error_ml) / v_eq * 100, 2) if v_eq else 0.0,
+        },
+    }
@@ -1,21 +1,29 @@
-from typing import List
+from collections import defaultdict
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from database import get_db
+import data.practices  # noqa: F401
+from data.registry import get_practice
+from database import dialect_insert, get_db
 from models.section import Section
 from models.student import Student
 from models.section_practice import SectionPractice
 from models.grade import Grade
+from models.session import PracticeSession
 from schemas.teacher import (
     SectionCreate, SectionUpdate, SectionResponse,
     StudentCreate, StudentUpdate, StudentResponse,
     SectionPracticeCreate, SectionPracticeUpdate, SectionPracticeResponse,
     GradeUpsert, GradeResponse,
+    CurveExportRequest,
 )
+from services.curve_export import EXPORT_COLUMNS, iter_curve_zip, stream_export_items
+from services.report_generator import get_scoring_table, score_sessions
 
 router = APIRouter(prefix="/teacher", tags=["teacher"])
 
@@ -222,20 +230,109 @@ async def delete_section_practice(practice_id: str, db: AsyncSession = Depends(g
 
 @router.put("/grades", response_model=GradeResponse)
 async def upsert_grade(payload: GradeUpsert, db: AsyncSession = Depends(get_db)):
+    # One INSERT ... ON CONFLICT on the unique (student, practice) pair, so
+    # concurrent saves of the same grade update it instead of colliding.
+    grades = Grade.__table__
+    stmt = dialect_insert(db.bind, grades).values(**payload.model_dump())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[grades.c.student_id, grades.c.section_practice_id],
+        set_={"score": stmt.excluded.score},
+    ).returning(*grades.c)
+    return (await db.execute(stmt)).one()._asdict()
+
+
+# ── Section scores ────────────────────────────────────────────────────────
+
+@router.get("/sections/{code}/scores")
+async def section_scores(
+    code: str,
+    practice_id: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Score every session of the section's students against the current rules.
+
+    Sessions are scored per practice in one vectorized pass and nothing is
+    written back; the stored ``total_score`` is returned alongside so
+    differences stand out.
+    """
+    section = await _section_by_code(code, db)
+    names = select(Student.name).where(Student.section_id == section.id)
+
+    query = select(PracticeSession).where(PracticeSession.student_name.in_(names))
+    if practice_id is not None:
+        query = query.where(PracticeSession.practice_id == practice_id)
     result = await db.execute(
-        select(Grade).where(
-            Grade.student_id == payload.student_id,
-            Grade.section_practice_id == payload.section_practice_id,
-        )
+        query.order_by(PracticeSession.practice_id, PracticeSession.student_name)
     )
-    grade = result.scalar_one_or_none()
 
-    if grade:
-        grade.score = payload.score
-    else:
-        grade = Grade(**payload.model_dump())
-        db.add(grade)
+    by_practice = defaultdict(list)
+    for session in result.scalars():
+        by_practice[session.practice_id].append(session)
+
+    sessions_out = []
+    practices_out = []
+    for pid, sessions in by_practice.items():
+        practice = get_practice(pid)
+        if practice is None:
+            continue
+        batch = score_sessions(practice, sessions)
+        criteria_ids = [rule.criterion_id for rule in get_scoring_table(practice).rules]
+        totals = batch["total"]
+        for session, scores, total, passed in zip(
+            sessions, batch["scores"].tolist(), totals.tolist(), batch["passed"].tolist(),
+        ):
+            sessions_out.append({
+                "session_id": session.id,
+                "student_name": session.student_name,
+                "practice_id": pid,
+                "status": session.status,
+                "total_score": round(total, 2),
+                "stored_score": session.total_score,
+                "passed": passed,
+                "criteria": dict(zip(criteria_ids, scores)),
+            })
+        practices_out.append({
+            "practice_id": pid,
+            "sessions": len(sessions),
+            "average": round(float(totals.mean()), 2),
+            "passed": int(batch["passed"].sum()),
+        })
+
+    return {"section": section.code, "practices": practices_out, "sessions": sessions_out}
+
+
+# ── Curve export ──────────────────────────────────────────────────────────
+
+@router.post("/curves/export")
+async def export_curves(payload: CurveExportRequest, db: AsyncSession = Depends(get_db)):
+    """Stream a ZIP with the titration curve of every selected session.
+
+    Sessions are picked by ``session_ids`` or, for ``section_code``, by
+    matching the section's student names; ``practice_id`` narrows either.
+    Sessions without a recorded volume are left out.
+    """
+    if not payload.section_code and not payload.session_ids:
+        raise HTTPException(status_code=422, detail="Indica una sección o una lista de sesiones")
+
+    query = select(*EXPORT_COLUMNS).where(PracticeSession.recorded_volume.is_not(None))
+    if payload.session_ids:
+        query = query.where(PracticeSession.id.in_(payload.session_ids))
+    if payload.section_code:
+        section = await _section_by_code(payload.section_code, db)
+        names = select(Student.name).where(Student.section_id == section.id)
+        query = query.where(PracticeSession.student_name.in_(names))
+    if payload.practice_id is not None:
+        query = query.where(PracticeSession.practice_id == payload.practice_id)
+
+    if (await db.execute(query.limit(1))).first() is None:
+        raise HTTPException(status_code=404, detail="No hay sesiones con curva para exportar")
+    items = stream_export_items(
+        query.order_by(PracticeSession.practice_id, PracticeSession.student_name)
+    )
 
-    await db.flush()
-    await db.refresh(grade)
-    return grade
+    filename = f"curvas_{payload.section_code or 'sesiones'}.zip"
+    return StreamingResponse(
+        iter_curve_zip(items, payload.format),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
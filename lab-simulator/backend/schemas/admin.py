@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class RescoreRequest(BaseModel):
+    practice_id: Optional[int] = None
+    chunk_size: Optional[int] = Field(None, ge=1, le=10000)
+    dry_run: bool = False
@@ -1,11 +1,12 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 
 class CalculationValidateRequest(BaseModel):
     session_id: str
     student_result: float
     formula_used: Optional[str] = None
+    uncertainty: bool = False   # opt in: adds a Monte Carlo confidence interval
 
 
 class CalculationValidateResponse(BaseModel):
@@ -16,6 +17,8 @@ class CalculationValidateResponse(BaseModel):
     is_within_tolerance: bool
     tolerance: float
     feedback: str
+    confidence_interval: Optional[List[float]] = None
+    deviation_explainable: Optional[bool] = None
 
 
 class ExpectedVolumeRequest(BaseModel):
@@ -27,3 +30,47 @@ class ExpectedVolumeRequest(BaseModel):
 class ExpectedVolumeResponse(BaseModel):
     expected_volume: float
     explanation: str
+
+
+class ExpectedVolumeRangeRequest(BaseModel):
+    practice_id: int
+    sample_id: Optional[str] = None
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    step: Optional[float] = Field(None, gt=0)
+
+
+class ExpectedVolumeRangeResponse(BaseModel):
+    practice_id: int
+    sample_id: Optional[str] = None
+    start: float
+    step: float
+    count: int
+    measured_values: List[float]
+    expected_volumes: List[Optional[float]]
+
+
+class CalculationBatchItem(BaseModel):
+    session_id: str
+    student_result: float
+
+
+class CalculationBatchRequest(BaseModel):
+    items: List[CalculationBatchItem] = Field(..., min_length=1, max_length=1000)
+
+
+class CalculationBatchResult(BaseModel):
+    session_id: str
+    correct_result: Optional[float] = None
+    theoretical_result: Optional[float] = None
+    student_result: float
+    percent_error: Optional[float] = None
+    is_within_tolerance: Optional[bool] = None
+    feedback: Optional[str] = None
+    error: Optional[str] = None
+
+
+class CalculationBatchResponse(BaseModel):
+    validated: int
+    failed: int
+    results: List[CalculationBatchResult]
@@ -51,3 +51,10 @@ class MaterialsUpdate(BaseModel):
 
 class TitrationUpdate(BaseModel):
     recorded_volume: float
+
+
+class SessionPatch(BaseModel):
+    stage: Optional[StageUpdate] = None
+    measurement: Optional[MeasurementUpdate] = None
+    materials: Optional[MaterialsUpdate] = None
+    titration: Optional[TitrationUpdate] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Literal
 from datetime import datetime
 
 
@@ -99,3 +99,12 @@ class GradeResponse(BaseModel):
     score: Optional[float] = None
 
     model_config = {"from_attributes": True}
+
+
+# ── Curve export ──────────────────────────────────────────────────────────
+
+class CurveExportRequest(BaseModel):
+    section_code: Optional[str] = None
+    session_ids: Optional[List[str]] = None
+    practice_id: Optional[int] = None
+    format: Literal["svg", "png"] = "png"
@@ -1,12 +1,23 @@
+import math
+
+from config import settings
 from data.registry import get_practice
+from services.formula_compiler import get_formula
+
+_CONFIDENCE = 95.0
 
 
 def calculate_expected_volume(practice_config, measured_value, sample_id=None):
-    """Calculate expected titrant volume based on practice config."""
+    """Calculate expected titrant volume based on practice config.
+
+    *measured_value* may also be a NumPy array.
+    """
     titration = practice_config["titration"]
     prop = titration["proportionality"]
 
     if sample_id and "volumesBySample" in titration:
+        if sample_id not in titration["volumesBySample"]:
+            raise ValueError(f"Sample {sample_id} not found")
         base_volume = titration["volumesBySample"][sample_id]
     else:
         base_volume = titration["expectedVolume"]
@@ -22,42 +33,31 @@ def calculate_expected_volume(practice_config, measured_value, sample_id=None):
     return base_volume
 
 
-def validate_student_calculation(practice_id, recorded_volume, measured_value, student_result):
-    """Validate student's calculation against the correct result using THEIR recorded volume."""
+def _calculation_config(practice_id) -> dict:
     practice = get_practice(practice_id)
     if practice is None:
         raise ValueError(f"Practice {practice_id} not found")
+    calc = practice.get("calculation")
+    if not calc:
+        raise ValueError(f"Practice {practice_id} has no calculation config")
+    return calc
+
+
+def validate_student_calculation(practice_id, recorded_volume, measured_value, student_result,
+                                 uncertainty=False):
+    """Validate student's calculation against the correct result using THEIR recorded volume.
 
-    calc = practice["calculation"]
+    With ``uncertainty=True`` the result also carries a Monte Carlo
+    ``confidence_interval`` for the correct result and whether the
+    student's deviation from the theoretical value is explainable by
+    instrument resolution (``deviation_explainable``).
+    """
+    calc = _calculation_config(practice_id)
     tolerance = calc["tolerance"]
 
     # Calculate correct result based on student's actual recorded volume
-    if practice_id == 5:
-        M_EDTA = 0.01
-        PM_CaCO3 = 100.09
-        correct = (recorded_volume * M_EDTA * PM_CaCO3 * 1000) / measured_value
-    elif practice_id == 4:
-        # Volhard back-titration: [(V_AgNO3 × M_AgNO3) - (V_KSCN × M_KSCN)] × PM_Cl / V_muestra
-        V_AgNO3 = 50.0
-        M_AgNO3 = 0.10
-        M_KSCN = 0.08
-        PM_Cl = 35.45
-        correct = ((V_AgNO3 * M_AgNO3) - (recorded_volume * M_KSCN)) * PM_Cl / measured_value
-    elif practice_id == 3:
-        # Argentometry (Mohr): mg Cl⁻/mL = (V_AgNO3 × M_AgNO3 × PM_Cl) / V_muestra
-        M_AgNO3 = 0.010
-        PM_Cl = 35.45
-        correct = (recorded_volume * M_AgNO3 * PM_Cl) / measured_value
-    elif practice_id == 2:
-        # Saponification index: IS = [(V_KOH × M_KOH) - (V_HCl × M_HCl)] × PM_KOH × 1000 / m_grasa
-        # recorded_volume = V_HCl in mL; measured_value = fat mass in g
-        V_KOH = 25.0    # mL
-        M_KOH = 0.50    # mol/L
-        M_HCl = 0.50    # mol/L
-        PM_KOH = 56.11  # g/mol
-        correct = ((V_KOH / 1000 * M_KOH) - (recorded_volume / 1000 * M_HCl)) * PM_KOH * 1000 / measured_value
-    else:
-        correct = 0.0
+    formula = get_formula(practice_id)
+    correct = formula(recorded_volume, measured_value) if formula else 0.0
 
     # Theoretical result uses the practice's reference expected values
     theoretical = calc.get("expectedResult", correct)
@@ -68,13 +68,9 @@ def validate_student_calculation(practice_id, recorded_volume, measured_value, s
         percent_error = abs(student_result - theoretical) / theoretical * 100
 
     is_within = percent_error <= tolerance
+    feedback = calculation_feedback(student_result, theoretical, percent_error, tolerance, is_within)
 
-    if is_within:
-        feedback = f"Correcto. Tu resultado ({student_result:.2f}) está dentro del {tolerance}% de tolerancia. Error: {percent_error:.2f}%."
-    else:
-        feedback = f"Tu resultado ({student_result:.2f}) difiere del valor teórico ({theoretical:.2f}) con un error de {percent_error:.2f}%."
-
-    return {
+    result = {
         "correct_result": round(correct, 2),
         "theoretical_result": round(theoretical, 2),
         "student_result": round(student_result, 2),
@@ -83,3 +79,121 @@ def validate_student_calculation(practice_id, recorded_volume, measured_value, s
         "tolerance": tolerance,
         "feedback": feedback,
     }
+
+    if uncertainty:
+        interval = result_confidence_interval(practice_id, recorded_volume, measured_value)
+        explainable = None
+        if interval is not None:
+            # Compare at the 2 decimals students report their results with
+            lo, hi = round(interval[0], 2), round(interval[1], 2)
+            explainable = all(lo <= round(x, 2) <= hi for x in (student_result, theoretical))
+            # ...but report the bounds with enough decimals to tell them apart
+            decimals = _interval_decimals(*interval)
+            interval = [round(interval[0], decimals), round(interval[1], decimals)]
+            if not is_within:
+                result["feedback"] = f"{feedback} {_uncertainty_feedback(interval, decimals, explainable)}"
+        result["confidence_interval"] = interval
+        result["deviation_explainable"] = explainable
+
+    return result
+
+
+def result_confidence_interval(practice_id, recorded_volume, measured_value, samples=None):
+    """95 % interval for the correct result given the instruments' resolution.
+
+    Propagates the reading uncertainty through the compiled formula by
+    Monte Carlo.  The endpoint lies somewhere within the last drop added,
+    so the titrant volume is drawn uniformly from
+    [recorded - dropVolume, recorded]; the measured value is drawn
+    uniformly within ± half of ``measurement.resolution``.  Draws are
+    float32 and seeded from the inputs, so the same reading always gets
+    the same interval.  Returns ``(low, high)`` or ``None`` when the
+    practice has no formula or the result is not finite.
+    """
+    import numpy as np
+
+    practice = get_practice(practice_id)
+    formula = get_formula(practice_id)
+    if practice is None or formula is None:
+        return None
+
+    drop = practice.get("titration", {}).get("dropVolume", 0.0)
+    resolution = practice.get("measurement", {}).get("resolution", 0.0)
+    n = samples or settings.CALC_MC_SAMPLES
+
+    rng = np.random.default_rng(hash((practice_id, recorded_volume, measured_value)) & 0xFFFFFFFF)
+    u = rng.random((2, n), dtype=np.float32)
+    volumes = np.float32(recorded_volume) - u[0] * np.float32(drop)
+    measured = np.float32(measured_value) + (u[1] - np.float32(0.5)) * np.float32(resolution)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        results = formula(volumes, measured)
+
+    # A full (SIMD) sort of float32 beats np.percentile's partition here.
+    results = np.sort(results)
+    k = int(round((100.0 - _CONFIDENCE) / 200 * (n - 1)))
+    lo, hi = results[k], results[n - 1 - k]
+    if not (np.isfinite(lo) and np.isfinite(hi)):
+        return None
+    return float(lo), float(hi)
+
+
+def _interval_decimals(lo, hi, minimum=2, maximum=6):
+    """Decimals that show two significant figures of the interval's width."""
+    width = abs(hi - lo)
+    if width == 0:
+        return minimum
+    return min(maximum, max(minimum, 1 - math.floor(math.log10(width))))
+
+
+def _uncertainty_feedback(interval, decimals, explainable):
+    lo, hi = interval
+    if explainable:
+        return (f"Con la resolución de los instrumentos el resultado puede estar entre "
+                f"{lo:.{decimals}f} y {hi:.{decimals}f} (IC 95%), así que la diferencia es explicable por la medición.")
+    return (f"Con la resolución de los instrumentos el resultado debería estar entre "
+            f"{lo:.{decimals}f} y {hi:.{decimals}f} (IC 95%); la diferencia no se explica solo por la medición.")
+
+
+def calculation_feedback(student_result, theoretical, percent_error, tolerance, is_within):
+    """Feedback sentence shown to the student for a validated calculation."""
+    if is_within:
+        return f"Correcto. Tu resultado ({student_result:.2f}) está dentro del {tolerance}% de tolerancia. Error: {percent_error:.2f}%."
+    return f"Tu resultado ({student_result:.2f}) difiere del valor teórico ({theoretical:.2f}) con un error de {percent_error:.2f}%."
+
+
+def validate_calculations_batch(practice_id, recorded_volumes, measured_values, student_results):
+    """Vectorized ``validate_student_calculation`` for many sessions of one practice.
+
+    Takes equal-length sequences and returns the same keys as the scalar
+    version, with NumPy arrays instead of numbers (``tolerance`` stays a
+    scalar).  ``is_computable`` is False where the formula has no finite
+    value, e.g. a zero measured value.
+    """
+    import numpy as np
+
+    calc = _calculation_config(practice_id)
+    tolerance = calc["tolerance"]
+    recorded = np.asarray(recorded_volumes, dtype=float)
+    measured = np.asarray(measured_values, dtype=float)
+    student = np.asarray(student_results, dtype=float)
+
+    formula = get_formula(practice_id)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correct = formula(recorded, measured) if formula else np.zeros_like(recorded)
+        if "expectedResult" in calc:
+            theoretical = np.full_like(student, calc["expectedResult"])
+        else:
+            theoretical = correct
+        percent_error = np.where(
+            theoretical == 0, 0.0, np.abs(student - theoretical) / theoretical * 100
+        )
+
+    return {
+        "correct_result": np.round(correct, 2),
+        "theoretical_result": np.round(theoretical, 2),
+        "student_result": np.round(student, 2),
+        "percent_error": np.round(percent_error, 2),
+        "is_within_tolerance": percent_error <= tolerance,
+        "is_computable": np.isfinite(correct) & np.isfinite(percent_error),
+        "tolerance": tolerance,
+    }
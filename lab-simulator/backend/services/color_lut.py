@@ -0,0 +1,113 @@
+"""
+Color lookup tables for titration color transitions.
+
+Each practice's ``titration.colorTransitions`` is sampled once, when the
+practice is registered, into a dense table of ``LUT_SIZE`` RGB entries
+spread evenly between the first and the last transition.  A color is then
+a clamp and an index instead of a scan over the transitions.
+
+The table is also served whole (``GET /practices/{id}/color-lut``) so the
+titration canvas can resolve colors locally.
+"""
+
+import base64
+from typing import List, Optional, Tuple
+
+from data.registry import get_compiled, register_compiler
+
+LUT_SIZE = 1024
+
+
+def _hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
+    hex_color = hex_color.lstrip("#")
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+
+class ColorLut:
+    """Dense RGB table over the progress range ``[start, stop]``.
+
+    *first* and *last* are the config's own end colors, returned verbatim
+    at or beyond the ends of the range.
+    """
+
+    def __init__(self, practice_id: int, start: float, stop: float, rgb: bytes,
+                 first: Optional[str] = None, last: Optional[str] = None):
+        self.practice_id = practice_id
+        self.start = start
+        self.stop = stop
+        self.rgb = rgb
+        self.size = len(rgb) // 3
+        self.hex: List[str] = [
+            f"#{rgb[i]:02x}{rgb[i + 1]:02x}{rgb[i + 2]:02x}" for i in range(0, len(rgb), 3)
+        ]
+        self.first = first or self.hex[0]
+        self.last = last or self.hex[-1]
+        span = stop - start
+        self._scale = (self.size - 1) / span if span > 0 else 0.0
+
+    def index(self, progress: float) -> int:
+        i = round((progress - self.start) * self._scale)
+        return min(max(i, 0), self.size - 1)
+
+    def color(self, progress: float) -> str:
+        if progress <= self.start:
+            return self.first
+        if progress >= self.stop:
+            return self.last
+        return self.hex[self.index(progress)]
+
+    def to_dict(self, encoding: str = "rgb") -> dict:
+        """Serializable table; ``rgb`` packs it as base64 of 3 bytes per entry."""
+        if encoding == "rgb":
+            colors = base64.b64encode(self.rgb).decode("ascii")
+        else:
+            colors = self.hex
+        return {
+            "practice_id": self.practice_id,
+            "start": self.start,
+            "stop": self.stop,
+            "size": self.size,
+            "encoding": encoding,
+            "colors": colors,
+        }
+
+    def __repr__(self) -> str:
+        return f"ColorLut(practice={self.practice_id}, {self.start}..{self.stop}, size={self.size})"
+
+
+def build_color_lut(practice_id: int, transitions: list, size: int = LUT_SIZE) -> ColorLut:
+    """Sample *transitions* (sorted by progress) into a ``size``-entry table.
+
+    Entries use the same linear RGB interpolation the transitions always
+    had; progress at or outside the ends takes the first or last
+    transition's color exactly as written in the config.
+    """
+    stops = [(t["progress"], _hex_to_rgb(t["color"])) for t in transitions]
+    start, stop = stops[0][0], stops[-1][0]
+    rgb = bytearray()
+    seg = 0
+    for i in range(size):
+        progress = start + (stop - start) * i / (size - 1) if size > 1 else start
+        while seg < len(stops) - 2 and progress > stops[seg + 1][0]:
+            seg += 1
+        (p0, c0), (p1, c1) = stops[seg], stops[min(seg + 1, len(stops) - 1)]
+        t = (progress - p0) / (p1 - p0) if p1 > p0 else 1.0
+        t = min(max(t, 0.0), 1.0)
+        rgb.extend(int(a + (b - a) * t) for a, b in zip(c0, c1))
+    return ColorLut(practice_id, start, stop, bytes(rgb),
+                    transitions[0]["color"], transitions[-1]["color"])
+
+
+def _compile_practice(practice: dict) -> Optional[ColorLut]:
+    transitions = (practice.get("titration") or {}).get("colorTransitions")
+    if not transitions:
+        return None
+    return build_color_lut(practice["id"], transitions)
+
+
+def get_color_lut(practice_id: int) -> Optional[ColorLut]:
+    """Return the compiled color table for *practice_id*, or ``None``."""
+    return get_compiled(practice_id, "color_lut")
+
+
+register_compiler("color_lut", _compile_practice)
@@ -0,0 +1,108 @@
+"""
+In-process LRU cache for rendered titration curves.
+
+A curve image depends only on the practice, the student's burette reading,
+the theoretical expected volume, the measured sample value (and sample, for
+practices with per-sample volumes) and the output variant (format,
+resolution, content-encoding).  Readings are quantized to the burette
+resolution before both the lookup and the render, so two requests that
+would draw the same figure share one cache entry.
+
+The cache is bounded by the total size of the stored images (not by entry
+count) and evicts least-recently-used entries first.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from config import settings
+
+
+def _quantize(value: Optional[float], step: float) -> Optional[float]:
+    if value is None:
+        return None
+    return round(round(value / step) * step, 6)
+
+
+def normalize_curve_inputs(session_data: dict) -> dict:
+    """Return the subset of *session_data* that affects the rendered curve.
+
+    ``recorded_volume`` is snapped to ``settings.CURVE_VOLUME_STEP`` so that
+    readings which are indistinguishable on the plot map to the same image.
+    """
+    return {
+        "recorded_volume": _quantize(session_data.get("recorded_volume"), settings.CURVE_VOLUME_STEP),
+        "expected_volume": _quantize(session_data.get("expected_volume"), 1e-4),
+        "measured_value": _quantize(session_data.get("measured_value"), 1e-4),
+        "sample_id": session_data.get("sample_id"),
+    }
+
+
+def curve_cache_key(practice_id: int, inputs: dict, variant: Hashable) -> Tuple:
+    """Build the cache key for already-normalized curve *inputs* in output *variant*."""
+    return (
+        practice_id,
+        inputs["recorded_volume"],
+        inputs["expected_volume"],
+        inputs["measured_value"],
+        inputs["sample_id"],
+        variant,
+    )
+
+
+class CurveCache:
+    """Thread-safe LRU mapping of curve keys to image bytes with a byte budget."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: Hashable, data: bytes) -> None:
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+curve_cache = CurveCache(settings.CURVE_CACHE_MAX_BYTES)
@@ -0,0 +1,310 @@
+"""
+Config-driven titration curve engine.
+
+Every practice declares its curve chemistry in ``titration["curve"]``:
+
+    chemistry       "precipitation" | "complexometric" | "acid-base"
+    constants       Ksp (precipitation), Kf and alphaY4 (complexometric)
+                    or Kw (acid-base)
+    initialVolume   mL in the flask before the first drop of titrant
+    addSampleVolume add the measured sample volume to initialVolume
+    pRange          [min, max] clip for the plotted pX
+    pComplement     plot pComplement − pX (e.g. 14 − pOH = pH)
+    xMaxFactor      x-axis extent as a multiple of V_eq
+    yMax            fixed y-axis top (auto from the curve when absent)
+    labels          axis labels, title and reaction for the plot
+    competingPrecipitate
+                    optional second precipitate that can exchange with the
+                    titrant's (Volhard: AgCl next to AgSCN): ``Ksp``,
+                    ``reagentTotal`` (mmol of the excess reagent added
+                    before titrating) and ``coated`` (True when the first
+                    precipitate is isolated, e.g. by nitrobenzene)
+
+The species followed (X) is whatever the titrant consumes (the analyte,
+or in a back titration such as Volhard or saponification the excess
+reagent left over), present as n_X = C_titrant · V_eq, so back titrations
+need no flag of their own.  At every titrant volume the kernel solves the
+mass and charge balances exactly, for all volumes at once, with the
+totals C_X = n_X / (V0 + V) and C_T = C·V / (V0 + V):
+
+    precipitation, acid-base   [X] − K/[X] = C_X − C_T
+                               (ion product K = Ksp or Kw; a precipitate
+                               only while C_X·C_T exceeds Ksp)
+    complexometric             K′f·[X]² + (1 + K′f·(C_T − C_X))·[X] − C_X = 0
+
+Both are quadratics, evaluated in the form that avoids cancellation on
+either side of the equivalence point.  With an uncoated competing
+precipitate the silver balance has no closed form and is solved by
+bisection on log[X], vectorized across the curve.  Adding a practice only
+needs a config block, not a new Python branch.
+"""
+
+import numpy as np
+
+import data.practices  # noqa: F401 — registers practices in render workers too
+from config import settings
+from data.registry import get_practice
+from services.calculation_engine import calculate_expected_volume
+
+CHEM_ACID_BASE, CHEM_PRECIPITATION, CHEM_COMPLEXOMETRIC = 0, 1, 2
+CHEMISTRY_CODES = {
+    "acid-base": CHEM_ACID_BASE,
+    "precipitation": CHEM_PRECIPITATION,
+    "complexometric": CHEM_COMPLEXOMETRIC,
+}
+
+# Bisection steps over the 30-decade bracket: ~3e-14 decades of resolution
+_BISECT_ITERATIONS = 50
+_LOG_X_FLOOR = -30.0
+
+
+# ── Model ─────────────────────────────────────────────────────────────────────
+
+def _equilibrium_constant(chemistry: str, constants: dict) -> float:
+    if chemistry == "precipitation":
+        return constants["Ksp"]
+    if chemistry == "complexometric":
+        return constants["Kf"] * constants.get("alphaY4", 1.0)
+    if chemistry == "acid-base":
+        return constants.get("Kw", 1.0e-14)
+    raise ValueError(f"Química de curva desconocida: {chemistry}")
+
+
+def curve_model(practice_id: int, session_data: dict) -> dict:
+    """Resolve a practice's curve config against one session's measurements."""
+    practice = get_practice(practice_id)
+    titration = (practice or {}).get("titration") or {}
+    curve = titration.get("curve")
+    if curve is None:
+        raise ValueError(f"Curva de titulación no disponible para práctica {practice_id}")
+
+    measurement = practice.get("measurement") or {}
+    measured = session_data.get("measured_value") or measurement.get("defaultValue", 0.0)
+    sample_id = session_data.get("sample_id")
+    if sample_id not in titration.get("volumesBySample", {}):
+        sample_id = None
+
+    v_eq = calculate_expected_volume(practice, measured, sample_id)
+    c_titrant = titration["titrantConcentration"]
+    chemistry = curve["chemistry"]
+
+    v0 = curve["initialVolume"]
+    if curve.get("addSampleVolume"):
+        v0 += measured
+
+    # The competing precipitate only takes part when it is not coated;
+    # session_data["coated"] overrides the practice default.
+    competing = curve.get("competingPrecipitate") or {}
+    coated = session_data.get("coated")
+    if coated is None:
+        coated = competing.get("coated", False)
+    k_competing = competing["Ksp"] if competing and not coated else 0.0
+
+    return {
+        "practice_id": practice_id,
+        "chemistry": chemistry,
+        "K": _equilibrium_constant(chemistry, curve.get("constants", {})),
+        "c_titrant": c_titrant,
+        "n_analyte": v_eq * c_titrant,        # mmol consumed at equivalence
+        "k_competing": k_competing,
+        "reagent_total": competing.get("reagentTotal", 0.0),
+        "v0": v0,
+        "v_eq": v_eq,
+        "measured": measured,
+        "measured_unit": measurement.get("unit", ""),
+        "tolerance": titration.get("endpointTolerance", 0.5),
+        "p_range": curve.get("pRange", [0, 14]),
+        "p_complement": curve.get("pComplement"),
+        "x_max": v_eq * curve.get("xMaxFactor", 1.65),
+        "y_max": curve.get("yMax"),
+        "curve": curve,
+    }
+
+
+# ── Kernel ────────────────────────────────────────────────────────────────────
+
+def _free_ion(d, K):
+    """Positive root of x − K/x = d (1:1 ion product *K*, d = C_X − C_T)."""
+    s = np.sqrt(d * d + 4 * K)
+    return np.where(d >= 0, (d + s) / 2, 2 * K / (s - d))
+
+
+def _free_metal(c_m, c_l, K):
+    """Free metal for total metal *c_m*, total ligand *c_l* and K′f = *K*."""
+    b = 1 + K * (c_l - c_m)
+    s = np.sqrt(b * b + 4 * K * c_m)
+    return np.where(b >= 0, 2 * c_m / (b + s), (s - b) / (2 * K))
+
+
+def _free_ion_competing(d, c_comp, c_t, k_comp, K):
+    """
+    Free [X] with the titrant's precipitate (Ksp *K*) and a competing one
+    (Ksp *k_comp*, *c_comp* total counter-ion) both free to form or dissolve.
+
+    Solves the mass balance of X,  [X] − d − [A] − [T] = 0  with
+    [A] = min(c_comp, k_comp/[X]) and [T] = min(c_t, K/[X]), by bisection
+    on log[X] for every element at once.  The residual grows with [X], is
+    negative at the floor and non-negative at [X] = d + c_comp + c_t.
+    """
+    lo = np.full(np.shape(d), _LOG_X_FLOOR)
+    hi = np.log10(np.maximum(d + c_comp + c_t, 10.0 ** _LOG_X_FLOOR))
+    for _ in range(_BISECT_ITERATIONS):
+        mid = (lo + hi) / 2
+        x = 10.0 ** mid
+        residual = x - d - np.minimum(c_comp, k_comp / x) - np.minimum(c_t, K / x)
+        above = residual > 0
+        hi = np.where(above, mid, hi)
+        lo = np.where(above, lo, mid)
+    return 10.0 ** ((lo + hi) / 2)
+
+
+def px_kernel(V, v0, K, n_X, c_titrant, chemistry, p_complement, p_lo, p_hi,
+              k_competing=0.0, reagent_total=0.0):
+    """
+    pX for titrant volume(s) *V* (mL).
+
+    Every parameter may be a scalar or an array broadcasting against *V*,
+    so one call can evaluate a whole curve or one point for each of many
+    sessions with different practices.  *chemistry* is a ``CHEM_*`` code,
+    *p_complement* is NaN where pX is plotted as is, and a positive
+    *k_competing* adds the competing precipitate of ``reagent_total`` mmol.
+    """
+    V = np.asarray(V, dtype=float)
+    Vt = v0 + V
+    c_x = n_X / Vt
+    c_t = c_titrant * V / Vt
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        ion = _free_ion(c_x - c_t, K)
+        X = np.where(chemistry == CHEM_PRECIPITATION, np.minimum(ion, c_x), ion)
+        X = np.where(chemistry == CHEM_COMPLEXOMETRIC, _free_metal(c_x, c_t, K), X)
+
+        if np.any(np.asarray(k_competing) > 0):
+            Vt, c_x, c_t, K, k_comp, total, X = (
+                np.array(a, dtype=float) for a in
+                np.broadcast_arrays(Vt, c_x, c_t, K, k_competing, reagent_total, X)
+            )
+            sel = k_comp > 0
+            c_comp = total[sel] / Vt[sel] - c_x[sel]
+            X[sel] = _free_ion_competing(
+                c_x[sel] - c_t[sel], c_comp, c_t[sel], k_comp[sel], K[sel],
+            )
+
+    pX = -np.log10(np.maximum(X, 10.0 ** _LOG_X_FLOOR))
+    pX = np.where(np.isnan(p_complement), pX, p_complement - pX)
+    return np.clip(pX, p_lo, p_hi)
+
+
+def px_at(model: dict, V) -> np.ndarray:
+    """Vectorized pX for titrant volume(s) *V* (mL) under *model*."""
+    p_complement = model["p_complement"]
+    lo, hi = model["p_range"]
+    return px_kernel(
+        V, model["v0"], model["K"], model["n_analyte"], model["c_titrant"],
+        CHEMISTRY_CODES[model["chemistry"]],
+        np.nan if p_complement is None else p_complement,
+        lo, hi, model["k_competing"], model["reagent_total"],
+    )
+
+
+# ── Sampling ──────────────────────────────────────────────────────────────────
+
+def _adaptive_sample(f, x0: float, x1: float, tol: float = None,
+                     initial: int = 48, max_depth: int = 14):
+    """
+    Sample y = f(x) on [x0, x1] densely only where the curve bends.
+
+    Starts from *initial* evenly spaced points and repeatedly bisects every
+    interval where the curve, probed at its quarter points, deviates from
+    the straight chord by more than *tol* (in pX units, default
+    ``settings.CURVE_SAMPLE_TOLERANCE``).  Flat regions stay coarse while
+    the jump at the equivalence point gets as many points as it needs.
+    *f* must accept and return numpy arrays.
+    """
+    if tol is None:
+        tol = settings.CURVE_SAMPLE_TOLERANCE
+
+    x = np.linspace(x0, x1, initial)
+    y = f(x)
+    for _ in range(max_depth):
+        dx = np.diff(x)
+        probes = f(np.concatenate([x[:-1] + dx / 4, x[:-1] + dx * 3 / 4])).reshape(2, -1)
+        chord = np.stack([y[:-1] * 0.75 + y[1:] * 0.25, y[:-1] * 0.25 + y[1:] * 0.75])
+        split = (np.abs(probes - chord) > tol).any(axis=0)
+        if not split.any():
+            break
+        xm = ((x[:-1] + x[1:]) / 2)[split]
+        idx = np.nonzero(split)[0] + 1
+        x = np.insert(x, idx, xm)
+        y = np.insert(y, idx, f(xm))
+    return x, y
+
+
+def _downsample(x: np.ndarray, y: np.ndarray, n: int):
+    """
+    Largest-Triangle-Three-Buckets reduction of (x, y) to *n* points.
+
+    Keeps both end points and, from every bucket in between, the point that
+    spans the largest triangle with its neighbours, so the jump at the
+    equivalence point survives even at a few hundred points.
+    """
+    size = len(x)
+    if n >= size or n < 3:
+        return x, y
+
+    edges = np.linspace(1, size - 1, n - 1).astype(int)
+    keep = np.empty(n, dtype=int)
+    keep[0], keep[-1] = 0, size - 1
+
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_hi = edges[i + 2] if i + 2 < len(edges) else size
+        cx = x[hi:nxt_hi].mean()
+        cy = y[hi:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+
+    return x[keep], y[keep]
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def compute_curve(model: dict, points: int = None) -> dict:
+    """
+    Evaluate *model* into plot-ready arrays.
+
+    'volume' and 'px' are numpy arrays (reduced to *points* samples when
+    given); the remaining keys describe the equivalence point, tolerance
+    band and axis ranges.
+    """
+    v_eq = model["v_eq"]
+    V, pX = _adaptive_sample(lambda v: px_at(model, v), 0.02, model["x_max"])
+
+    beyond = pX[V > v_eq * 0.1]
+    y_peak = float(beyond.max()) if beyond.size else model["p_range"][1]
+    y_max = model["y_max"] or min(y_peak * 1.08, model["p_range"][1])
+
+    if points:
+        V, pX = _downsample(V, pX, points)
+
+    labels = model["curve"].get("labels", {})
+    return {
+        "volume": V,
+        "px": pX,
+        "v_eq": v_eq,
+        "px_eq": float(px_at(model, v_eq)),
+        "tolerance": model["tolerance"],
+        "x_max": model["x_max"],
+        "y_max": y_max,
+        "x_label": labels.get("xPlain", "V / mL"),
+        "y_label": labels.get("yPlain", "pX"),
+    }
+
+
+def compute_titration_curve(practice_id: int, session_data: dict, points: int = None) -> dict:
+    """Curve arrays for *practice_id* plus the student's ``recorded`` reading."""
+    data = compute_curve(curve_model(practice_id, session_data), points)
+    data["recorded"] = session_data.get("recorded_volume") or 0.0
+    return data
@@ -0,0 +1,165 @@
+"""
+Batch export of titration curves as a streamed ZIP archive.
+
+Curves are rendered through the shared ``render_pool`` with a bounded
+number of jobs in flight, and every finished image is written into the
+archive and handed to the client immediately.  The sessions themselves
+are read as they are needed (``stream_export_items``), only the columns
+the curve uses, so only those rows, the images inside the window and the
+current ZIP chunk are held in memory: an export of a whole section costs
+the same as one of a handful of sessions.
+"""
+
+import asyncio
+import re
+import zipfile
+from collections import deque
+from typing import AsyncIterable, AsyncIterator, List, NamedTuple
+
+from database import async_session
+from models.session import PracticeSession
+from services.curve_cache import curve_cache, curve_cache_key, normalize_curve_inputs
+from services.curve_output import CurveVariant
+from services.render_pool import RenderPoolBusy, render_pool
+
+
+# Columns ``export_item`` reads; select these instead of whole sessions.
+EXPORT_COLUMNS = (
+    PracticeSession.id,
+    PracticeSession.student_name,
+    PracticeSession.practice_id,
+    PracticeSession.recorded_volume,
+    PracticeSession.expected_volume,
+    PracticeSession.measured_value,
+    PracticeSession.sample_id,
+)
+
+_EXPORT_BATCH_SIZE = 500
+
+
+class CurveExportItem(NamedTuple):
+    session_id: str
+    student_name: str
+    practice_id: int
+    inputs: dict
+
+
+async def render_curve_cached(practice_id: int, inputs: dict, variant: CurveVariant,
+                              wait: bool = False) -> bytes:
+    """Return the curve *variant* for normalized *inputs*, rendering it on a miss.
+
+    ``wait=True`` queues behind other renders instead of raising
+    ``RenderPoolBusy`` when the pool is saturated.
+    """
+    key = curve_cache_key(practice_id, inputs, variant)
+    data = curve_cache.get(key)
+    if data is None:
+        data = await render_pool.render(practice_id, inputs, variant, wait=wait)
+        curve_cache.put(key, data)
+    return data
+
+
+def export_item(session) -> CurveExportItem:
+    """Build an export item from a row with the ``EXPORT_COLUMNS``."""
+    return CurveExportItem(
+        session_id=session.id,
+        student_name=session.student_name or "",
+        practice_id=session.practice_id,
+        inputs=normalize_curve_inputs({
+            "recorded_volume": session.recorded_volume,
+            "expected_volume": session.expected_volume,
+            "measured_value": session.measured_value,
+            "sample_id": session.sample_id,
+        }),
+    )
+
+
+async def stream_export_items(query) -> AsyncIterator[CurveExportItem]:
+    """Export items for the rows of *query* (a select of ``EXPORT_COLUMNS``).
+
+    Rows are fetched ``_EXPORT_BATCH_SIZE`` at a time through a session of
+    its own, since they are read while the response streams, after the
+    request's session has been closed.
+    """
+    async with async_session() as db:
+        result = await db.stream(query.execution_options(yield_per=_EXPORT_BATCH_SIZE))
+        async for row in result:
+            yield export_item(row)
+
+
+def _archive_name(item: CurveExportItem, fmt: str) -> str:
+    student = re.sub(r"[^\w-]+", "_", item.student_name).strip("_") or "sin_nombre"
+    return f"practica{item.practice_id}/{student}_{item.session_id[:8]}.{fmt}"
+
+
+class _ZipSink:
+    """Write-only, unseekable file object that buffers one ZIP chunk at a time."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def iter_curve_zip(items: AsyncIterable[CurveExportItem], fmt: str) -> AsyncIterator[bytes]:
+    """Yield a ZIP archive with one curve image per item, in item order.
+
+    Sessions whose curve cannot be drawn are skipped and listed in
+    ``errores.txt`` at the end of the archive.
+    """
+    window = max(1, render_pool.workers) * 2
+    # PNG is already deflate-compressed; SVG text still shrinks a lot.
+    compression = zipfile.ZIP_STORED if fmt == "png" else zipfile.ZIP_DEFLATED
+    variant = CurveVariant(fmt)
+    sink = _ZipSink()
+    in_flight: deque = deque()
+    skipped: List[str] = []
+
+    def submit(item: CurveExportItem) -> None:
+        job = asyncio.ensure_future(
+            render_curve_cached(item.practice_id, item.inputs, variant, wait=True)
+        )
+        in_flight.append((item, job))
+
+    async def write_oldest(zf: zipfile.ZipFile) -> bytes:
+        item, job = in_flight.popleft()
+        try:
+            data = await job
+        except (ValueError, RenderPoolBusy) as e:
+            skipped.append(f"{item.session_id}\t{item.student_name}\t{e}")
+            return b""
+        zf.writestr(_archive_name(item, fmt), data, compress_type=compression)
+        return sink.drain()
+
+    try:
+        with zipfile.ZipFile(sink, "w") as zf:
+            async for item in items:
+                submit(item)
+                if len(in_flight) >= window:
+                    chunk = await write_oldest(zf)
+                    if chunk:
+                        yield chunk
+            while in_flight:
+                chunk = await write_oldest(zf)
+                if chunk:
+                    yield chunk
+            if skipped:
+                zf.writestr("errores.txt", "\n".join(skipped) + "\n")
+        yield sink.drain()
+    finally:
+        # Client went away mid-download: drop the renders nobody will read.
+        for _, job in in_flight:
+            job.cancel()
+        aclose = getattr(items, "aclose", None)
+        if aclose is not None:
+            await aclose()
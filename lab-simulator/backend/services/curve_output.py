@@ -0,0 +1,166 @@
+"""
+Output variants for rendered titration curves.
+
+A curve can be served as compact SVG (text kept as ``<text>``, or drawn as
+glyph outlines on request), PNG or WebP at a chosen DPI, and
+SVG can be pre-compressed with gzip or brotli.  ``negotiate_variant`` picks
+the smallest representation the client accepts from the query string and
+the ``Accept`` / ``Accept-Encoding`` headers; the chosen ``CurveVariant``
+is part of the cache key, so every variant is rendered and compressed once.
+
+brotli is optional: without the package ``br`` is never offered.
+
+Rendered bytes are a pure function of the practice's curve config, the
+normalized session inputs and the variant, which lets ``curve_etag``
+derive a strong ETag without rendering anything.
+"""
+
+import gzip
+import hashlib
+import json
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+
+from data.registry import get_practice
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+# Bump whenever the drawing or encoding changes for identical inputs, so
+# clients holding an old ETag fetch the new image.
+RENDER_VERSION = 2
+
+_MEDIA_TYPES = {
+    'svg': 'image/svg+xml',
+    'png': 'image/png',
+    'webp': 'image/webp',
+}
+
+# Most compact first: gzipped SVG is a fraction of either raster format.
+_FORMAT_PREFERENCE = ('svg', 'webp', 'png')
+
+
+class CurveVariant(NamedTuple):
+    fmt: str = 'svg'              # 'svg' | 'png' | 'webp'
+    dpi: Optional[int] = None     # raster formats only; None = renderer default
+    text: bool = True             # SVG only: real <text>; False draws glyph paths
+    encoding: str = 'identity'    # SVG only: 'identity' | 'gzip' | 'br'
+
+    @property
+    def media_type(self) -> str:
+        return _MEDIA_TYPES[self.fmt]
+
+
+@lru_cache(maxsize=None)
+def webp_supported() -> bool:
+    """Whether the installed Pillow can encode WebP (checked on first use)."""
+    try:
+        from PIL import features
+    except ImportError:
+        return False
+    return bool(features.check('webp'))
+
+
+def _parse_q(header: Optional[str]) -> Dict[str, float]:
+    """Map each token of an ``Accept``-style header to its q-value."""
+    weights = {}
+    for part in (header or '').split(','):
+        token, *params = [p.strip() for p in part.split(';')]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        weights[token.lower()] = q
+    return weights
+
+
+def _accepts_media(weights: Dict[str, float], media_type: str) -> bool:
+    if not weights:
+        return True
+    major = media_type.split('/')[0]
+    for token in (media_type, f'{major}/*', '*/*'):
+        if token in weights:
+            return weights[token] > 0
+    return False
+
+
+def _pick_encoding(accept_encoding: Optional[str]) -> str:
+    weights = _parse_q(accept_encoding)
+    if brotli is not None and weights.get('br', 0) > 0:
+        return 'br'
+    if weights.get('gzip', weights.get('*', 0)) > 0:
+        return 'gzip'
+    return 'identity'
+
+
+def negotiate_variant(
+    fmt: Optional[str] = None,
+    dpi: Optional[int] = None,
+    text: bool = True,
+    accept: Optional[str] = None,
+    accept_encoding: Optional[str] = None,
+) -> CurveVariant:
+    """Choose the curve variant to serve.
+
+    An explicit *fmt* wins; otherwise the first format in
+    ``_FORMAT_PREFERENCE`` allowed by *accept* is used (SVG when nothing
+    matches).  Raises ``ValueError`` for WebP when Pillow lacks support.
+    """
+    if fmt is None:
+        weights = _parse_q(accept)
+        candidates = [f for f in _FORMAT_PREFERENCE
+                      if f != 'webp' or webp_supported()]
+        fmt = next((f for f in candidates if _accepts_media(weights, _MEDIA_TYPES[f])), 'svg')
+    elif fmt == 'webp' and not webp_supported():
+        raise ValueError("Formato WebP no disponible en este servidor")
+
+    if fmt == 'svg':
+        return CurveVariant('svg', None, text, _pick_encoding(accept_encoding))
+    return CurveVariant(fmt, dpi)
+
+
+def encode_body(data: bytes, encoding: str) -> bytes:
+    """Apply the HTTP content-coding *encoding* to *data*."""
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=9)
+    return data
+
+
+# ── Conditional requests ──────────────────────────────────────────────────────
+
+@lru_cache(maxsize=None)
+def _curve_config_digest(practice_id: int) -> str:
+    # Every practice key the curve model reads: the titration config, and
+    # the measurement's unit and defaultValue (axis label, unset samples).
+    practice = get_practice(practice_id) or {}
+    config = {key: practice.get(key) for key in ('titration', 'measurement')}
+    config = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(config.encode('utf-8')).hexdigest()[:16]
+
+
+def curve_etag(practice_id: int, inputs: dict, variant: CurveVariant) -> str:
+    """Strong ETag (quoted) for the curve image of normalized *inputs*."""
+    parts = [RENDER_VERSION, practice_id, _curve_config_digest(practice_id),
+             sorted(inputs.items()), list(variant)]
+    digest = hashlib.sha256(json.dumps(parts, default=str).encode('utf-8'))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """``If-None-Match`` check (weak comparison, as RFC 9110 prescribes)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return any(t.removeprefix('W/') == etag for t in tags)
@@ -0,0 +1,129 @@
+"""
+Compiler for practice result formulas.
+
+Each practice's ``calculation`` config declares its variables (symbol,
+source and, for constants, value) and an ``expression`` written in those
+symbols with Python arithmetic syntax, e.g.::
+
+    "expression": "V_EDTA * M_EDTA * PM_CaCO3 * 1000 / V_muestra"
+
+The expression is parsed once, when the practice is registered: constants
+are folded in, the remaining symbols become arguments, and the result is
+compiled to a plain function.  Only numbers, declared symbols, parentheses
+and ``+ - * / **`` are allowed, so the evaluator works unchanged on floats
+and on NumPy arrays.
+"""
+
+import ast
+from typing import Dict, Optional
+
+from data.registry import get_compiled, register_compiler
+
+# Variable source → keyword argument of the compiled evaluator
+_SOURCE_ARGS = {
+    "titration_result": "recorded_volume",
+    "measurement": "measured_value",
+}
+
+_ALLOWED_BINOPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow)
+_ALLOWED_UNARYOPS = (ast.UAdd, ast.USub)
+
+
+class CompiledFormula:
+    """Evaluator for one practice formula: ``formula(recorded_volume, measured_value)``."""
+
+    def __init__(self, practice_id: int, expression: str, fn):
+        self.practice_id = practice_id
+        self.expression = expression
+        self._fn = fn
+
+    def __call__(self, recorded_volume, measured_value):
+        return self._fn(recorded_volume=recorded_volume, measured_value=measured_value)
+
+    def __repr__(self) -> str:
+        return f"CompiledFormula(practice={self.practice_id}, {self.expression!r})"
+
+
+class _Resolver(ast.NodeTransformer):
+    """Validate the expression tree and bind every symbol to a constant or argument."""
+
+    def __init__(self, constants: Dict[str, float], inputs: Dict[str, str]):
+        self.constants = constants
+        self.inputs = inputs
+
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _ALLOWED_BINOPS):
+            raise ValueError(f"Operador no permitido: {type(node.op).__name__}")
+        return self.generic_visit(node)
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, _ALLOWED_UNARYOPS):
+            raise ValueError(f"Operador no permitido: {type(node.op).__name__}")
+        return self.generic_visit(node)
+
+    def visit_Constant(self, node):
+        if type(node.value) not in (int, float):
+            raise ValueError(f"Literal no permitido: {node.value!r}")
+        return node
+
+    def visit_Name(self, node):
+        if node.id in self.constants:
+            return ast.copy_location(ast.Constant(self.constants[node.id]), node)
+        if node.id in self.inputs:
+            return ast.copy_location(ast.Name(self.inputs[node.id], ast.Load()), node)
+        raise ValueError(f"Variable no declarada en la fórmula: {node.id}")
+
+    def generic_visit(self, node):
+        if not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp,
+                                 ast.Constant, ast.Name, ast.operator, ast.unaryop)):
+            raise ValueError(f"Expresión no permitida: {type(node).__name__}")
+        return super().generic_visit(node)
+
+
+def compile_formula(practice_id: int, calculation: dict) -> CompiledFormula:
+    """Compile ``calculation["expression"]`` against ``calculation["variables"]``."""
+    expression = calculation["expression"]
+    constants: Dict[str, float] = {}
+    inputs: Dict[str, str] = {}
+    for var in calculation.get("variables", []):
+        source = var.get("source")
+        if source == "constant":
+            constants[var["symbol"]] = var["value"]
+        elif source in _SOURCE_ARGS:
+            inputs[var["symbol"]] = _SOURCE_ARGS[source]
+        else:
+            raise ValueError(f"Fuente de variable desconocida: {source}")
+
+    tree = _Resolver(constants, inputs).visit(ast.parse(expression, mode="eval"))
+    func = ast.Expression(ast.Lambda(
+        args=ast.arguments(
+            posonlyargs=[], args=[], vararg=None,
+            kwonlyargs=[ast.arg(a) for a in _SOURCE_ARGS.values()],
+            kw_defaults=[None] * len(_SOURCE_ARGS),
+            kwarg=None, defaults=[],
+        ),
+        body=tree.body,
+    ))
+    ast.fix_missing_locations(func)
+    code = compile(func, f"<formula practice {practice_id}>", "eval")
+    fn = eval(code, {"__builtins__": {}})
+    return CompiledFormula(practice_id, expression, fn)
+
+
+def _compile_practice(practice: dict) -> Optional[CompiledFormula]:
+    calculation = practice.get("calculation")
+    if not calculation or "expression" not in calculation:
+        return None
+    return compile_formula(practice["id"], calculation)
+
+
+def get_formula(practice_id: int) -> Optional[CompiledFormula]:
+    """Return the compiled result formula for *practice_id*, or ``None``."""
+    return get_compiled(practice_id, "formula")
+
+
+register_compiler("formula", _compile_practice)
@@ -0,0 +1,142 @@
+"""
+SQL statement timing and a sampled slow-query log.
+
+``instrument(engine)`` hooks SQLAlchemy's ``before_cursor_execute`` /
+``after_cursor_execute`` events (and ``handle_error``, which discards the
+start time of a statement that failed) to time every statement the engine
+runs:
+
+- each statement is folded into per-shape aggregates (count, total and
+  max time), where the shape is the SQL text with expanded ``IN`` lists
+  and multi-row ``VALUES`` collapsed, so ``IN (?, ?)`` and ``IN (?, ?, ?)``
+  count as one statement;
+- statements slower than ``settings.SQL_SLOW_QUERY_MS`` are always logged,
+  and a ``settings.SQL_LOG_SAMPLE_RATE`` fraction of the rest too.
+
+Records go to the ``lab_simulator.sql`` logger through a ``QueueHandler``:
+the request only enqueues them, and a ``QueueListener`` thread writes them
+to stderr.  Bound parameters are never logged.
+
+This replaces engine-wide ``echo``, which writes every statement to stdout
+synchronously; set ``settings.SQL_ECHO`` to get that back when debugging.
+"""
+
+import atexit
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List
+
+from sqlalchemy import event
+
+from config import settings
+
+logger = logging.getLogger("lab_simulator.sql")
+
+# "(?, ?, ?)" / "($1, $2)" / "(%s, %s)" → "(?, ...)"
+_PARAM_LIST = re.compile(r"\((?:\?|\$\d+|%s|%\(\w+\)s)(?:, (?:\?|\$\d+|%s|%\(\w+\)s))+\)")
+# "VALUES (...), (...), (...)" → "VALUES (...), ..."
+_VALUES_ROWS = re.compile(r"(VALUES \([^()]*\))(?:, \([^()]*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    """SQL text with whitespace, parameter lists and extra VALUES rows collapsed."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _VALUES_ROWS.sub(r"\1, ...", shape)
+    return _PARAM_LIST.sub("(?, ...)", shape)
+
+
+class QueryStats:
+    """Per-shape statement counts and timings."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, list] = {}   # shape → [count, total ms, max ms]
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        shape = statement_shape(statement)
+        with self._lock:
+            entry = self._stats.get(shape)
+            if entry is None:
+                self._stats[shape] = [1, elapsed_ms, elapsed_ms]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed_ms
+                if elapsed_ms > entry[2]:
+                    entry[2] = elapsed_ms
+
+    def top(self, limit: int = 20) -> List[dict]:
+        """Statement shapes with the most total time, slowest first."""
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda kv: kv[1][1], reverse=True)[:limit]
+        return [
+            {
+                "statement": shape,
+                "count": count,
+                "total_ms": round(total, 3),
+                "mean_ms": round(total / count, 3),
+                "max_ms": round(worst, 3),
+            }
+            for shape, (count, total, worst) in items
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStats()
+
+_listener = None
+
+
+def _start_log_listener() -> None:
+    """Route ``lab_simulator.sql`` records through a queue to a stderr writer thread."""
+    global _listener
+    if _listener is not None:
+        return
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    _listener = QueueListener(records, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+    logger.addHandler(QueueHandler(records))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def instrument(engine) -> None:
+    """Time every statement of *engine* and log the slow and sampled ones."""
+    _start_log_listener()
+    slow_ms = settings.SQL_SLOW_QUERY_MS
+    sample_rate = settings.SQL_LOG_SAMPLE_RATE
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        query_stats.record(statement, elapsed_ms)
+        if elapsed_ms >= slow_ms:
+            logger.warning("slow query %.1f ms: %s", elapsed_ms, statement_shape(statement))
+        elif sample_rate and random.random() < sample_rate:
+            logger.info("query %.1f ms: %s", elapsed_ms, statement_shape(statement))
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _failed(context):
+        # A failing statement never reaches after_cursor_execute; drop its
+        # start time so the stack stays paired with the next statements.
+        conn = context.connection
+        starts = conn.info.get("query_start") if conn is not None else None
+        if starts:
+            starts.pop()
@@ -0,0 +1,139 @@
+"""
+Process pool for titration-curve rendering.
+
+matplotlib is CPU bound and not thread-safe, so rendering inside an
+``async def`` handler stalls every other request on the worker.  Curves are
+instead rendered in a small pool of worker processes that import the
+plotting stack once, at start-up, and hand the image bytes back through an
+awaitable.
+
+The number of jobs admitted at once (running + queued) is capped; when the
+pool is saturated ``RenderPoolBusy`` is raised so the caller can answer 503
+instead of letting the queue grow without bound.  A worker that dies
+(crash, OOM kill) breaks a ``ProcessPoolExecutor`` for good, so the pool is
+then replaced and the jobs it failed get ``RenderPoolBusy`` as well.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from config import settings
+from services.curve_output import CurveVariant, encode_body
+
+
+class RenderPoolBusy(Exception):
+    """Raised when the render queue is full."""
+
+
+# ── Worker-side functions (run in the child processes) ────────────────────────
+
+def _warm_worker() -> None:
+    """Import the plotting stack so the first real job does not pay for it."""
+    import numpy  # noqa: F401
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+    import services.titration_curve  # noqa: F401
+
+
+def _noop() -> None:
+    return None
+
+
+def _render_job(practice_id: int, inputs: dict, variant: CurveVariant) -> bytes:
+    from services.titration_curve import generate_titration_curve
+    data = generate_titration_curve(
+        practice_id, inputs, variant.fmt, dpi=variant.dpi, svg_text=variant.text,
+    )
+    return encode_body(data, variant.encoding)
+
+
+# ── Pool ──────────────────────────────────────────────────────────────────────
+
+class RenderPool:
+    """Bounded pool of warm rendering workers.
+
+    ``workers=0`` renders on a single background thread instead of separate
+    processes (useful for development and constrained hosts); the event loop
+    is still never blocked.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self, warm: bool = False) -> None:
+        """Create the executor; with *warm* its workers load the plotting
+        stack right away, in the background, instead of on the first job."""
+        if self._executor is not None:
+            return
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_warm_worker,
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix='curve-render',
+                initializer=_warm_worker,
+            )
+        if warm:
+            # Workers are created lazily on submit; spawn every one of them now.
+            for _ in range(max(1, self.workers)):
+                self._executor.submit(_noop)
+
+    def _replace_broken(self, broken: Executor) -> None:
+        """Swap in a fresh executor for *broken* (once, however many jobs saw it break)."""
+        if self._executor is not broken:
+            return
+        self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    def shutdown(self) -> None:
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+
+    async def render(self, practice_id: int, inputs: dict, variant: CurveVariant,
+                     wait: bool = False) -> bytes:
+        """Render a curve variant off the event loop and return its encoded bytes.
+
+        With ``wait=True`` a saturated pool delays the job instead of
+        raising ``RenderPoolBusy`` (used by batch exports), and a job lost to
+        a dead worker is retried once on the replacement pool.
+        """
+        while self._pending >= self.max_pending:
+            if not wait:
+                raise RenderPoolBusy(f"{self._pending} curve renders already queued")
+            await asyncio.sleep(0.05)
+        if self._executor is None:
+            self.start()
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            for attempt in range(2 if wait else 1):
+                executor = self._executor
+                try:
+                    return await loop.run_in_executor(executor, _render_job, practice_id, inputs, variant)
+                except BrokenProcessPool:
+                    self._replace_broken(executor)
+            raise RenderPoolBusy("a curve render worker died; the pool was restarted")
+        finally:
+            self._pending -= 1
+
+
+render_pool = RenderPool(settings.CURVE_RENDER_WORKERS, settings.CURVE_RENDER_MAX_PENDING)
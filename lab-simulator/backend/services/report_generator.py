@@ -1,102 +1,268 @@
+"""
+Evaluation reports from compiled scoring rules.
+
+Each practice's ``evaluation.criteria`` is compiled once, at registration,
+into a ``ScoringTable``: one rule per criterion with a typed extractor for
+the session fields it reads and its possible outcomes (score, feedback).
+
+- boolean criteria pass when their field is set (or true);
+- range criteria turn one or two fields into an error and pick the first
+  tier whose ``maxError`` covers it, by binary search over the tiers'
+  increasing ``maxError`` values.
+
+``generate_report`` scores one session with ``bisect``;
+``score_sessions`` / ``generate_reports`` score a whole batch with one
+NumPy pass per criterion.
+"""
+
+from bisect import bisect_left
 from datetime import datetime
+from operator import attrgetter
+from typing import Callable, List, NamedTuple, Tuple
 
+from data.registry import get_compiled, register_compiler
 
-def generate_report(session, practice_config):
-    """Generate evaluation report based on session data and practice evaluation criteria."""
-    evaluation = practice_config.get("evaluation", {})
-    criteria_config = evaluation.get("criteria", [])
-    criteria_scores = []
-    total_score = 0.0
+# criterion id → (session field, test, feedback when met, feedback when not).
+# "truthy" needs a true value, "present" any non-null one.
+_BOOLEAN_CRITERIA = {
+    "materials": ("materials_correct", "truthy",
+                  "Selección correcta de materiales.", "Materiales seleccionados incorrectamente."),
+    "measurement": ("measured_value", "present",
+                    "Medición registrada correctamente.", "No se registró la medición."),
+    "assembly": ("assembly_correct", "truthy",
+                 "Montaje completado correctamente.", "Montaje incompleto o incorrecto."),
+    "interpretation": ("student_calculation", "present",
+                       "Interpretación realizada.", "No se realizó interpretación."),
+}
+
+# criterion id → (session fields, test, feedback when a field is missing).
+# One field is the error itself; two give |first − second|.
+_RANGE_CRITERIA = {
+    "endpoint": (("recorded_volume", "expected_volume"), "truthy",
+                 "No se registró lectura de titulación."),
+    "calculation": (("percent_error",), "present",
+                    "No se realizó el cálculo."),
+}
+
+
+class ScoringRule(NamedTuple):
+    criterion_id: str
+    label: str
+    weight: float
+    kind: str                       # "boolean" | "range" | "none" (unknown criterion)
+    fields: Tuple[str, ...]         # session fields read
+    test: str                       # "truthy" | "present"
+    max_errors: Tuple[float, ...]   # range: strictly increasing tier bounds
+    scores: tuple                   # score per outcome
+    feedbacks: Tuple[str, ...]      # feedback per outcome
+    outcome: Callable               # session → outcome index
+
+    # Outcomes, by index:
+    #   boolean  0 = met, 1 = not met
+    #   range    0..n-1 = tier, n = no tier covers the error, n+1 = field missing
+    #   none     0 = no points, no feedback
+
+
+class ScoringTable(NamedTuple):
+    practice_id: int
+    rules: Tuple[ScoringRule, ...]
+    max_score: float
+    passing_score: float
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """Every session field the rules read, without duplicates."""
+        return tuple(dict.fromkeys(f for rule in self.rules for f in rule.fields))
+
+
+# ── Compilation ───────────────────────────────────────────────────────────────
+
+def _boolean_extractor(field: str, test: str) -> Callable:
+    get = attrgetter(field)
+    if test == "truthy":
+        return lambda session: 0 if get(session) else 1
+    return lambda session: 0 if get(session) is not None else 1
+
+
+def _range_extractor(fields: Tuple[str, ...], test: str, max_errors: Tuple[float, ...]) -> Callable:
+    get = attrgetter(*fields)
+    two = len(fields) == 2
+    truthy = test == "truthy"
+    no_tier, missing = len(max_errors), len(max_errors) + 1
+
+    def outcome(session) -> int:
+        values = get(session) if two else (get(session),)
+        if truthy:
+            if not all(values):
+                return missing
+        elif None in values:
+            return missing
+        error = abs(values[0] - values[1]) if two else values[0]
+        if error != error:      # NaN never falls inside a tier
+            return no_tier
+        return bisect_left(max_errors, error)
+
+    return outcome
+
+
+def _compile_rule(criterion: dict) -> ScoringRule:
+    cid, ctype, weight = criterion["id"], criterion["type"], criterion["weight"]
+    base = (cid, criterion["label"], weight)
+
+    if ctype == "boolean" and cid in _BOOLEAN_CRITERIA:
+        field, test, met, not_met = _BOOLEAN_CRITERIA[cid]
+        return ScoringRule(*base, "boolean", (field,), test, (), (weight, 0), (met, not_met),
+                           _boolean_extractor(field, test))
+
+    if ctype == "range" and cid in _RANGE_CRITERIA:
+        fields, test, missing = _RANGE_CRITERIA[cid]
+        # Tiers are matched first-to-last; one whose maxError does not exceed
+        # an earlier tier's can never match, so dropping it leaves the
+        # bounds strictly increasing without changing any result.
+        tiers = []
+        for tier in criterion.get("scoring", []):
+            if not tiers or tier["maxError"] > tiers[-1]["maxError"]:
+                tiers.append(tier)
+        max_errors = tuple(t["maxError"] for t in tiers)
+        return ScoringRule(
+            *base, "range", fields, test, max_errors,
+            tuple(t["score"] for t in tiers) + (0, 0),
+            tuple(t["feedback"] for t in tiers) + ("", missing),
+            _range_extractor(fields, test, max_errors),
+        )
+
+    # Unknown criterion: always 0 points, no feedback
+    return ScoringRule(*base, "none", (), "present", (), (0,), ("",), lambda session: 0)
+
+
+def compile_scoring(practice: dict) -> ScoringTable:
+    """Compile ``practice["evaluation"]`` into a ``ScoringTable``."""
+    evaluation = practice.get("evaluation") or {}
+    return ScoringTable(
+        practice_id=practice["id"],
+        rules=tuple(_compile_rule(c) for c in evaluation.get("criteria", [])),
+        max_score=evaluation.get("maxScore", 100),
+        passing_score=evaluation.get("passingScore", 60),
+    )
 
-    for criterion in criteria_config:
-        cid = criterion["id"]
-        weight = criterion["weight"]
-        ctype = criterion["type"]
-        score = 0.0
-        feedback = ""
-
-        if ctype == "boolean":
-            if cid == "materials":
-                if session.materials_correct:
-                    score = weight
-                    feedback = "Selección correcta de materiales."
-                else:
-                    score = 0
-                    feedback = "Materiales seleccionados incorrectamente."
-            elif cid == "measurement":
-                if session.measured_value is not None:
-                    score = weight
-                    feedback = "Medición registrada correctamente."
-                else:
-                    score = 0
-                    feedback = "No se registró la medición."
-            elif cid == "assembly":
-                if session.assembly_correct:
-                    score = weight
-                    feedback = "Montaje completado correctamente."
-                else:
-                    score = 0
-                    feedback = "Montaje incompleto o incorrecto."
-            elif cid == "interpretation":
-                if session.student_calculation is not None:
-                    score = weight
-                    feedback = "Interpretación realizada."
-                else:
-                    score = 0
-                    feedback = "No se realizó interpretación."
-
-        elif ctype == "range":
-            scoring_tiers = criterion.get("scoring", [])
-            if cid == "endpoint":
-                if session.expected_volume and session.recorded_volume:
-                    error = abs(session.recorded_volume - session.expected_volume)
-                    for tier in scoring_tiers:
-                        if error <= tier["maxError"]:
-                            score = tier["score"]
-                            feedback = tier["feedback"]
-                            break
-                else:
-                    score = 0
-                    feedback = "No se registró lectura de titulación."
-
-            elif cid == "calculation":
-                if session.percent_error is not None:
-                    for tier in scoring_tiers:
-                        if session.percent_error <= tier["maxError"]:
-                            score = tier["score"]
-                            feedback = tier["feedback"]
-                            break
-                else:
-                    score = 0
-                    feedback = "No se realizó el cálculo."
-
-        criteria_scores.append({
-            "criterion_id": cid,
-            "criterion_label": criterion["label"],
-            "score": score,
-            "max_score": weight,
-            "feedback": feedback,
-        })
-        total_score += score
-
-    max_score = evaluation.get("maxScore", 100)
-    passing_score = evaluation.get("passingScore", 60)
-    passed = total_score >= passing_score
 
+def get_scoring_table(practice_config: dict) -> ScoringTable:
+    """Compiled table for a practice config (compiled now if not registered)."""
+    return get_compiled(practice_config["id"], "scoring") or compile_scoring(practice_config)
+
+
+register_compiler("scoring", compile_scoring)
+
+
+# ── Single session ────────────────────────────────────────────────────────────
+
+def _overall_feedback(total_score: float) -> str:
     if total_score >= 80:
-        overall = "Excelente desempeño en la práctica."
-    elif total_score >= 60:
-        overall = "Buen desempeño. Revisa los puntos de mejora."
-    else:
-        overall = "Desempeño insuficiente. Se recomienda repetir la práctica."
+        return "Excelente desempeño en la práctica."
+    if total_score >= 60:
+        return "Buen desempeño. Revisa los puntos de mejora."
+    return "Desempeño insuficiente. Se recomienda repetir la práctica."
+
 
+def _report(session, table: ScoringTable, outcomes, total_score: float, completed_at: str) -> dict:
+    criteria_scores = [
+        {
+            "criterion_id": rule.criterion_id,
+            "criterion_label": rule.label,
+            "score": rule.scores[i],
+            "max_score": rule.weight,
+            "feedback": rule.feedbacks[i],
+        }
+        for rule, i in zip(table.rules, outcomes)
+    ]
     return {
         "session_id": session.id,
         "practice_id": session.practice_id,
         "criteria": criteria_scores,
         "total_score": round(total_score, 2),
-        "max_score": max_score,
-        "passed": passed,
-        "overall_feedback": overall,
-        "completed_at": datetime.utcnow().isoformat(),
+        "max_score": table.max_score,
+        "passed": total_score >= table.passing_score,
+        "overall_feedback": _overall_feedback(total_score),
+        "completed_at": completed_at,
+    }
+
+
+def generate_report(session, practice_config):
+    """Generate evaluation report based on session data and practice evaluation criteria."""
+    table = get_scoring_table(practice_config)
+    outcomes = [rule.outcome(session) for rule in table.rules]
+    total_score = 0.0
+    for rule, i in zip(table.rules, outcomes):
+        total_score += rule.scores[i]
+    return _report(session, table, outcomes, total_score, datetime.utcnow().isoformat())
+
+
+# ── Batch ─────────────────────────────────────────────────────────────────────
+
+def _column(sessions, field: str):
+    """(values as float64 with NaN for null, non-null mask) for one session field."""
+    import numpy as np
+
+    raw = [getattr(s, field) for s in sessions]
+    present = np.fromiter((v is not None for v in raw), dtype=bool, count=len(raw))
+    values = np.array([np.nan if v is None else float(v) for v in raw], dtype=float)
+    return values, present
+
+
+def score_sessions(practice_config: dict, sessions: list) -> dict:
+    """Score *sessions* of one practice with one vectorized pass per criterion.
+
+    *sessions* only need the attributes in ``ScoringTable.fields``.  Returns
+    NumPy arrays: ``outcomes`` (N × criteria outcome indices into each
+    rule's ``scores``/``feedbacks``), ``scores`` (N × criteria), ``total``
+    and ``passed`` (N), plus the ``table`` used.
+    """
+    import numpy as np
+
+    table = get_scoring_table(practice_config)
+    n = len(sessions)
+    columns = {f: _column(sessions, f) for f in table.fields}
+
+    outcomes = np.zeros((n, len(table.rules)), dtype=np.int64)
+    for j, rule in enumerate(table.rules):
+        if rule.kind == "none":
+            continue
+        cols = [columns[f] for f in rule.fields]
+        ok = np.logical_and.reduce([present for _, present in cols])
+        if rule.test == "truthy":
+            ok &= np.logical_and.reduce([values != 0 for values, _ in cols])
+
+        if rule.kind == "boolean":
+            outcomes[:, j] = np.where(ok, 0, 1)
+            continue
+
+        values = [v for v, _ in cols]
+        error = np.abs(values[0] - values[1]) if len(values) == 2 else values[0]
+        # NaN sorts after every bound, i.e. "no tier"
+        tier = np.searchsorted(np.asarray(rule.max_errors, dtype=float), error, side="left")
+        outcomes[:, j] = np.where(ok, tier, len(rule.max_errors) + 1)
+
+    scores = np.zeros((n, len(table.rules)))
+    for j, rule in enumerate(table.rules):
+        scores[:, j] = np.asarray(rule.scores, dtype=float)[outcomes[:, j]]
+    total = scores.sum(axis=1)
+
+    return {
+        "table": table,
+        "outcomes": outcomes,
+        "scores": scores,
+        "total": total,
+        "passed": total >= table.passing_score,
     }
+
+
+def generate_reports(sessions: list, practice_config: dict) -> List[dict]:
+    """``generate_report`` for many sessions of one practice at once."""
+    batch = score_sessions(practice_config, sessions)
+    completed_at = datetime.utcnow().isoformat()
+    return [
+        _report(session, batch["table"], outcomes, total, completed_at)
+        for session, outcomes, total in zip(
+            sessions, batch["outcomes"].tolist(), batch["total"].tolist(),
+        )
+    ]
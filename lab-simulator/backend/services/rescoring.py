@@ -0,0 +1,311 @@
+"""
+Rescoring of completed sessions against the current evaluation rules.
+
+After a practice's ``evaluation`` config changes, the stored ``report``,
+``total_score``, ``feedback`` and ``PracticeResult`` rows no longer match
+what ``generate_report`` would produce.  ``rescore_sessions`` walks every
+completed session in primary-key order, one chunk at a time:
+
+1. read the chunk's scoring columns and its stored criterion results;
+2. score it with the batch scorer, one vectorized pass per practice;
+3. for sessions whose report changed, bulk-UPDATE the session row and
+   write its results with ``save_results`` (one INSERT ... ON CONFLICT);
+4. commit, and report progress.
+
+Each chunk is a short transaction that starts after the last id of the
+previous one (keyset pagination), so memory stays at one chunk however
+many sessions there are, other requests can write in between, and an
+interrupted run can simply be started again.
+
+Run from the command line (cwd: lab-simulator/backend)::
+
+    python -m services.rescoring [--practice 5] [--chunk-size 1000] [--dry-run]
+
+or through ``POST /api/admin/rescore`` (see ``routers/admin.py``).
+"""
+
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import delete, func, select, update
+
+import data.practices  # noqa: F401
+from config import settings
+from data.registry import get_all_practices, get_practice
+from database import async_session, dialect_insert
+from models.result import PracticeResult
+from models.session import PracticeSession
+from services.report_generator import generate_reports, get_scoring_table
+
+_RESULT_COLUMNS = (
+    PracticeResult.criterion_id,
+    PracticeResult.criterion_label,
+    PracticeResult.score,
+    PracticeResult.max_score,
+    PracticeResult.feedback,
+)
+
+
+async def save_results(db, results: List[dict]) -> None:
+    """Write per-criterion *results* (dicts with ``session_id`` and ``criterion_id``).
+
+    One ``INSERT ... ON CONFLICT (session_id, criterion_id) DO UPDATE``, so
+    concurrent writers of the same session update rows instead of adding
+    duplicates; criteria the rubric no longer has are then deleted, one
+    statement per distinct criterion set.
+    """
+    if not results:
+        return
+    table = PracticeResult.__table__
+    stmt = dialect_insert(db.bind, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.session_id, table.c.criterion_id],
+        set_={name: stmt.excluded[name] for name in ("criterion_label", "score", "max_score", "feedback")},
+    )
+    await db.execute(stmt, results)
+
+    criteria = defaultdict(set)
+    for r in results:
+        criteria[r["session_id"]].add(r["criterion_id"])
+    by_criteria = defaultdict(list)
+    for session_id, ids in criteria.items():
+        by_criteria[frozenset(ids)].append(session_id)
+    for ids, session_ids in by_criteria.items():
+        await db.execute(
+            delete(PracticeResult).where(
+                PracticeResult.session_id.in_(session_ids),
+                PracticeResult.criterion_id.notin_(ids),
+            )
+        )
+
+
+@dataclass
+class RescoreProgress:
+    total: int = 0          # completed sessions in scope when the run started
+    processed: int = 0
+    changed: int = 0        # sessions whose stored report was rewritten (or would be)
+    skipped: int = 0        # sessions of practices that are no longer registered
+    chunks: int = 0
+    dry_run: bool = False
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["percent"] = round(100 * self.processed / self.total, 1) if self.total else 100.0
+        data["elapsed"] = round((self.finished_at or time.time()) - self.started_at, 2)
+        return data
+
+
+def _scoring_columns() -> list:
+    """Session columns the rescoring reads: identity, stored report, rule inputs."""
+    fields = dict.fromkeys(
+        f for practice in get_all_practices() for f in get_scoring_table(practice).fields
+    )
+    stored = [PracticeSession.id, PracticeSession.practice_id, PracticeSession.completed_at,
+              PracticeSession.total_score, PracticeSession.feedback, PracticeSession.report]
+    return stored + [getattr(PracticeSession, f) for f in fields]
+
+
+def _result_key(rows) -> list:
+    """Order-independent comparable form of a session's criterion results."""
+    return sorted(
+        (r["criterion_id"], r["criterion_label"], float(r["score"] or 0),
+         float(r["max_score"] or 0), r["feedback"] or "")
+        for r in rows
+    )
+
+
+async def _rescore_chunk(db, rows, progress: RescoreProgress) -> None:
+    ids = [row.id for row in rows]
+    stored = defaultdict(list)
+    result = await db.execute(
+        select(PracticeResult.session_id, *_RESULT_COLUMNS)
+        .where(PracticeResult.session_id.in_(ids))
+    )
+    for r in result.mappings():
+        stored[r["session_id"]].append(r)
+
+    by_practice: Dict[int, list] = defaultdict(list)
+    for row in rows:
+        by_practice[row.practice_id].append(row)
+
+    session_updates: List[dict] = []
+    new_results: List[dict] = []
+    for practice_id, sessions in by_practice.items():
+        practice = get_practice(practice_id)
+        if practice is None:
+            progress.skipped += len(sessions)
+            continue
+        for session, report in zip(sessions, generate_reports(sessions, practice)):
+            if session.completed_at is not None:
+                report["completed_at"] = session.completed_at.isoformat()
+            results = [
+                {
+                    "session_id": session.id,
+                    "criterion_id": c["criterion_id"],
+                    "criterion_label": c["criterion_label"],
+                    "score": c["score"],
+                    "max_score": c["max_score"],
+                    "feedback": c["feedback"],
+                }
+                for c in report["criteria"]
+            ]
+            if (session.report == report
+                    and session.total_score == report["total_score"]
+                    and session.feedback == report["overall_feedback"]
+                    and _result_key(stored.get(session.id, [])) == _result_key(results)):
+                continue
+            session_updates.append({
+                "id": session.id,
+                "total_score": report["total_score"],
+                "feedback": report["overall_feedback"],
+                "report": report,
+            })
+            new_results.extend(results)
+
+    progress.changed += len(session_updates)
+    if progress.dry_run or not session_updates:
+        return
+
+    await db.execute(update(PracticeSession), session_updates)
+    await save_results(db, new_results)
+
+
+async def rescore_sessions(
+    practice_id: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    dry_run: bool = False,
+    progress: Optional[RescoreProgress] = None,
+    on_progress: Optional[Callable[[RescoreProgress], None]] = None,
+) -> RescoreProgress:
+    """Rescore completed sessions (of *practice_id*, or all) chunk by chunk.
+
+    ``dry_run`` only counts the sessions that would change.  *on_progress*
+    is called after every chunk with the running ``RescoreProgress``.
+    """
+    chunk_size = chunk_size or settings.RESCORE_CHUNK_SIZE
+    progress = progress or RescoreProgress()
+    progress.dry_run = dry_run
+
+    scope = [PracticeSession.status == "completed"]
+    if practice_id is not None:
+        scope.append(PracticeSession.practice_id == practice_id)
+
+    columns = _scoring_columns()
+    async with async_session() as db:
+        progress.total = await db.scalar(select(func.count()).select_from(PracticeSession).where(*scope))
+        last_id = None
+        while True:
+            query = select(*columns).where(*scope)
+            if last_id is not None:
+                query = query.where(PracticeSession.id > last_id)
+            rows = (await db.execute(query.order_by(PracticeSession.id).limit(chunk_size))).all()
+            if not rows:
+                break
+
+            await _rescore_chunk(db, rows, progress)
+            if dry_run:
+                await db.rollback()
+            else:
+                await db.commit()
+
+            last_id = rows[-1].id
+            progress.processed += len(rows)
+            progress.chunks += 1
+            if on_progress:
+                on_progress(progress)
+
+    progress.finished_at = time.time()
+    return progress
+
+
+# ── Background job ────────────────────────────────────────────────────────────
+
+@dataclass
+class RescoreJob:
+    id: str
+    practice_id: Optional[int]
+    progress: RescoreProgress
+    task: Optional[asyncio.Task] = None
+    error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.error:
+            return "failed"
+        if self.task is None or not self.task.done():
+            return "running"
+        return "finished"
+
+    def as_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "practice_id": self.practice_id,
+            "status": self.status,
+            "error": self.error,
+            **self.progress.as_dict(),
+        }
+
+
+# Jobs by id, oldest first; only the last _JOB_HISTORY are kept for polling.
+_jobs: Dict[str, RescoreJob] = {}
+_JOB_HISTORY = 20
+
+
+def running_job() -> Optional[RescoreJob]:
+    return next((job for job in _jobs.values() if job.status == "running"), None)
+
+
+def get_job(job_id: str) -> Optional[RescoreJob]:
+    return _jobs.get(job_id)
+
+
+def start_rescore_job(practice_id: Optional[int] = None, chunk_size: Optional[int] = None,
+                      dry_run: bool = False) -> RescoreJob:
+    """Run ``rescore_sessions`` as a task of the current event loop."""
+    job = RescoreJob(id=str(uuid4()), practice_id=practice_id, progress=RescoreProgress())
+
+    async def run():
+        try:
+            await rescore_sessions(practice_id, chunk_size, dry_run, progress=job.progress)
+        except Exception as e:
+            job.error = str(e)
+            job.progress.finished_at = time.time()
+
+    _jobs[job.id] = job
+    for old_id in list(_jobs)[:-_JOB_HISTORY]:
+        if _jobs[old_id].status != "running":
+            del _jobs[old_id]
+    job.task = asyncio.create_task(run(), name=f"rescore-{job.id[:8]}")
+    return job
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recalcula los puntajes de las sesiones completadas.")
+    parser.add_argument("--practice", type=int, default=None, help="solo esta práctica")
+    parser.add_argument("--chunk-size", type=int, default=settings.RESCORE_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="solo contar los cambios")
+    args = parser.parse_args()
+
+    def report(p: RescoreProgress) -> None:
+        d = p.as_dict()
+        print(f"\r{d['processed']}/{d['total']} ({d['percent']}%)  "
+              f"cambian {d['changed']}  omitidas {d['skipped']}  {d['elapsed']} s",
+              end="", flush=True)
+
+    progress = asyncio.run(rescore_sessions(args.practice, args.chunk_size, args.dry_run,
+                                            on_progress=report))
+    report(progress)
+    print("\n" + ("Simulación: no se guardó nada." if args.dry_run else "Listo."))
+
+
+if __name__ == "__main__":
+    main()
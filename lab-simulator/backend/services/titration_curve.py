@@ -1,26 +1,41 @@
 """
-Theoretical titration curve generator.
+Theoretical titration curve renderer.
 
-Produces an SVG figure (matplotlib) showing the calculated pMetal vs.
-volume-of-titrant curve for each implemented practice, with the student's
+Produces an SVG, PNG or WebP figure (matplotlib) of the theoretical pX vs.
+volume-of-titrant curve for any practice that declares a ``curve`` block in
+its titration config (see services/curve_engine.py), with the student's
 recorded endpoint marked against the theoretical equivalence point.
 
-Practice 4 (Volhard): pAg vs V(KSCN)
-  Back-titration of excess Ag⁺ with KSCN 0.08 M.
-  Ksp(AgSCN) = 1.0 × 10⁻¹²
-
-Practice 5 (Complexometry): pCa vs V(EDTA)
-  Titration of total hardness (Ca²⁺/Mg²⁺) with EDTA 0.01 M at pH 10.
-  K′f(CaY²⁻) at pH 10 = Kf × αY4⁻ = 10^10.65 × 0.36 ≈ 1.61 × 10¹⁰
+Rendering is split in two layers.  Everything that depends only on the
+practice and the sample (theoretical curve, axes, title, tolerance band,
+legend) is drawn once and kept in a small LRU of base layers; the
+student's reading line and error callout are then added per request —
+spliced into the cached SVG as plain elements, or blitted onto the cached
+Agg background for PNG and WebP.  A raster layer keeps only its background
+pixels (the figure is closed once drawn); the overlay is drawn on one
+shared canvas whose axes are moved to the layer's geometry.
+
+SVG output is compacted before caching: coordinates are rounded to
+hundredths of a point and text is kept as ``<text>``; glyph outlines, which
+render exactly without the fonts but weigh several times more, are opt-in.
 """
 
 import io
+import re
+import threading
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')
+import matplotlib.image as mpimg
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 
+from config import settings
+from services.curve_engine import compute_curve, curve_model
+
 
 # ── Style ─────────────────────────────────────────────────────────────────────
 
@@ -47,222 +62,321 @@ _STYLE = {
 }
 
 
-def _fig_to_bytes(fig, fmt: str = 'svg') -> bytes:
-    buf = io.BytesIO()
-    if fmt == 'png':
-        fig.savefig(buf, format='png', bbox_inches='tight', dpi=180)
-    else:
-        fig.savefig(buf, format='svg', bbox_inches='tight')
-    plt.close(fig)
-    return buf.getvalue()
+_PNG_DPI = 180
+_SVG_DECIMALS = 2
+_STUDENT_COLOR = '#DC2626'
+_ANNOT_FONTSIZE = 8.5
 
 
-def _annotate_error(ax, recorded_vol, v_eq, y_pos, y_tip):
-    """Red dashed annotation showing the student's error magnitude."""
+def _error_label(recorded_vol, v_eq):
+    """Callout text: the student's reading and its error against V_eq."""
     error_ml = recorded_vol - v_eq
     pct = abs(error_ml) / v_eq * 100 if v_eq else 0
     sign = '+' if error_ml >= 0 else ''
-    label = f'{sign}{error_ml:.2f} mL  ({pct:.1f}%)'
-
-    # Horizontal offset to keep label inside the axes
-    x_text = recorded_vol + v_eq * 0.06
-    ax.annotate(
-        label,
-        xy=(recorded_vol, y_tip),
-        xytext=(x_text, y_pos),
-        fontsize=8.5,
-        color='#DC2626',
-        arrowprops=dict(arrowstyle='->', color='#DC2626', lw=1.0),
-        bbox=dict(boxstyle='round,pad=0.3', facecolor='#FEF2F2',
-                  edgecolor='#FCA5A5', alpha=0.95),
-        zorder=10,
-    )
-
+    return f'{recorded_vol:.2f} mL: {sign}{error_ml:.2f} mL  ({pct:.1f}%)'
 
-# ── Practice 4 ────────────────────────────────────────────────────────────────
 
-def _curve_p4(recorded_vol: float, expected_vol: float, fmt: str = 'svg') -> bytes:
-    """
-    Argentometric back-titration (Volhard).
-    pAg = –log[Ag⁺]  vs.  V(KSCN) in mL.
-
-    Before eq.:  [Ag⁺] = (n_Ag_exc – M_KSCN·V) / (V0 + V)
-    After  eq.:  [Ag⁺] = Ksp / [SCN⁻];  [SCN⁻] = (M_KSCN·V – n_Ag_exc) / (V0 + V)
-    """
-    M_KSCN    = 0.08          # mol/L
-    Ksp_AgSCN = 1.0e-12
-    V0        = 73.0          # mL (10 sample + 10 H₂O + 1 HNO₃ + 50 AgNO₃ + 1 NB + 1 indicator)
+# Characters ``_error_label`` can produce
+_LABEL_CHARS = '0123456789.+-: mL()%'
 
-    # Moles of excess Ag⁺ (mmol → M when dividing by mL)
-    n_Ag = expected_vol * M_KSCN          # mmol = mL × mol/L (units consistent at mL scale)
 
-    V  = np.linspace(0.05, expected_vol * 1.65, 3000)
-    Vt = V0 + V
+def _label_advances(fontsize: float) -> dict:
+    """Advance width (points) of each label character in the overlay's SVG font."""
+    from matplotlib.font_manager import FontProperties, findfont, get_font
 
-    # Before equivalence
-    before = V < expected_vol
-    Ag_M_pre  = np.maximum((n_Ag - M_KSCN * V[before]) / Vt[before], 1e-15)
+    font = get_font(findfont(FontProperties(family='DejaVu Serif')))
+    font.set_size(fontsize, 72)
+    return {ch: font.load_char(ord(ch)).linearHoriAdvance / 65536 for ch in _LABEL_CHARS}
 
-    # After equivalence
-    after = ~before
-    SCN_M     = np.maximum((M_KSCN * V[after] - n_Ag) / Vt[after], 1e-15)
-    Ag_M_post = Ksp_AgSCN / SCN_M
 
-    pAg = np.empty_like(V)
-    pAg[before] = -np.log10(Ag_M_pre)
-    pAg[after]  = -np.log10(Ag_M_post)
-    pAg = np.clip(pAg, 0, 12)
-
-    # ── Plot ──────────────────────────────────────────────────────────────────
+def _new_axes():
     plt.rcParams.update(_STYLE)
-    fig, ax = plt.subplots(figsize=(8.5, 5))
+    return plt.subplots(figsize=(8.5, 5))
 
-    ax.plot(V, pAg, color='#2563EB', lw=2.2, zorder=3,
-            label='Curva teórica')
 
-    tol = 0.5
-    ax.axvspan(expected_vol - tol, expected_vol + tol,
-               alpha=0.13, color='#16A34A', zorder=1,
-               label=f'Tolerancia ±{tol} mL')
-    ax.axvline(expected_vol, color='#16A34A', lw=1.6, ls='-', zorder=4,
-               label=f'Punto de equivalencia  {expected_vol:.2f} mL')
-    ax.axvline(recorded_vol, color='#DC2626', lw=1.6, ls='--', zorder=4,
-               label=f'Lectura del estudiante  {recorded_vol:.2f} mL')
-
-    # Equivalence point marker
-    pAg_eq = -np.log10(np.sqrt(Ksp_AgSCN))   # = 6.0
-    ax.plot(expected_vol, pAg_eq, 'o', color='#16A34A',
-            ms=8, zorder=5, markeredgecolor='white', markeredgewidth=1)
+def _finish_axes(fig, ax, x_max, y_max, legend_loc='upper left'):
+    """Shared axis limits, ticks and legend for every practice's base layer."""
+    # Legend entry for the per-student line, which is drawn in the overlay
+    ax.plot([], [], color=_STUDENT_COLOR, lw=1.6, ls='--', label='Lectura del estudiante')
 
-    _annotate_error(ax, recorded_vol, expected_vol, y_pos=10.5, y_tip=8.5)
-
-    ax.set_xlabel(r'$V_{\mathrm{KSCN}}\ /\ \mathrm{mL}$', labelpad=6)
-    ax.set_ylabel(r'$\mathrm{p}[\mathrm{Ag}^{+}]$', labelpad=6)
-    ax.set_title(
-        'Curva de Titulación — Método de Volhard\n'
-        r'$\mathrm{Ag}^{+}_{\mathrm{(exc)}}\ +\ \mathrm{SCN}^{-}\ \longrightarrow\ \mathrm{AgSCN}{\downarrow}\ +\ \mathrm{K}^{+}$',
-        pad=10,
-    )
-    ax.set_xlim(0, expected_vol * 1.65)
-    ax.set_ylim(0, 12)
+    ax.set_xlim(0, x_max)
+    ax.set_ylim(0, y_max)
     ax.xaxis.set_minor_locator(ticker.AutoMinorLocator(4))
     ax.yaxis.set_minor_locator(ticker.AutoMinorLocator(4))
     ax.tick_params(which='minor', length=2, color='#94A3B8')
-    ax.legend(loc='upper left', framealpha=0.95)
+    ax.legend(loc=legend_loc, framealpha=0.95)
+    fig.tight_layout()
 
-    plt.tight_layout()
-    return _fig_to_bytes(fig, fmt)
 
+# ── SVG compaction ────────────────────────────────────────────────────────────
 
-# ── Practice 5 ────────────────────────────────────────────────────────────────
+_NUMBER = re.compile(r'-?\d+\.\d+')
+_GEOMETRY_ATTR = re.compile(r'\b(d|x|y|width|height)="([^"]*)"')
+_TRANSLATE = re.compile(r'translate\(([^)]*)\)')
+_INDENT = re.compile(r'\n\s+')
 
-def _curve_p5(recorded_vol: float, measured_value: float, fmt: str = 'svg') -> bytes:
-    """
-    Complexometric titration (EDTA, pH 10).
-    pCa = –log[Ca²⁺]  vs.  V(EDTA) in mL.
 
-    K′f(CaY²⁻) = Kf × αY4⁻ = 10^10.65 × 0.36 ≈ 1.61 × 10¹⁰
+def _short_number(match) -> str:
+    text = f'{float(match.group()):.{_SVG_DECIMALS}f}'.rstrip('0').rstrip('.')
+    return '0' if text == '-0' else text
 
-    Before eq.:  [Ca²⁺] ≈ (n_Ca – M_EDTA·V) / (V0 + V)   (K′f very large)
-    At     eq.:  [Ca²⁺] = √([CaY] / K′f)
-    After  eq.:  [Ca²⁺] = [CaY] / (K′f · [EDTA′])
-    """
-    M_EDTA   = 0.01
-    Kf_prime = (10 ** 10.65) * 0.36        # ≈ 1.61e10
 
-    V_sample = measured_value
-    V0       = V_sample + 10.0             # sample + 10 mL pH-10 buffer
-    V_eq     = 6.5 * measured_value / 100  # scales with sample volume
-    n_Ca     = V_eq * M_EDTA              # mmol of total hardness
+def _compact_svg(svg: str) -> str:
+    """Shrink matplotlib's SVG without changing how it looks.
 
-    V  = np.linspace(0.02, V_eq * 1.9, 3000)
-    Vt = V0 + V
-
-    before = V < V_eq - 0.005
-    at_eq  = np.abs(V - V_eq) <= 0.005
-    after  = V > V_eq + 0.005
-
-    pCa = np.empty_like(V)
-
-    # Before equivalence
-    Ca_free  = np.maximum((n_Ca - M_EDTA * V[before]) / Vt[before], 1e-15)
-    pCa[before] = -np.log10(Ca_free)
-
-    # At equivalence
-    CaY_eq   = n_Ca / Vt[at_eq]
-    Ca_eq    = np.sqrt(np.maximum(CaY_eq / Kf_prime, 1e-30))
-    pCa[at_eq] = -np.log10(np.maximum(Ca_eq, 1e-15))
-
-    # After equivalence
-    EDTA_exc = np.maximum((M_EDTA * V[after] - n_Ca) / Vt[after], 1e-15)
-    CaY_post = n_Ca / Vt[after]
-    Ca_post  = CaY_post / (Kf_prime * EDTA_exc)
-    pCa[after] = -np.log10(np.maximum(Ca_post, 1e-15))
-
-    pCa = np.clip(pCa, 0, 14)
-
-    # ── Plot ──────────────────────────────────────────────────────────────────
-    plt.rcParams.update(_STYLE)
-    fig, ax = plt.subplots(figsize=(8.5, 5))
+    Path data, positions and translations are rounded to ``_SVG_DECIMALS``
+    places and indentation is dropped.  Scale factors are left alone: glyph
+    outlines are placed with small ones that need their full precision.
+    """
+    svg = _GEOMETRY_ATTR.sub(
+        lambda m: f'{m.group(1)}="{" ".join(_NUMBER.sub(_short_number, m.group(2)).split())}"',
+        svg,
+    )
+    svg = _TRANSLATE.sub(lambda m: f'translate({_NUMBER.sub(_short_number, m.group(1))})', svg)
+    return _INDENT.sub('\n', svg)
+
+
+# ── Base layers ───────────────────────────────────────────────────────────────
+
+class _SvgLayer:
+    """Cached SVG of the static figure plus the data→SVG mapping of its axes."""
+
+    def __init__(self, fig, ax, v_eq, y_pos, y_tip, text=True):
+        self.v_eq, self.y_pos, self.y_tip = v_eq, y_pos, y_tip
+        self.xlim = ax.get_xlim()
+        self.ylim = ax.get_ylim()
+
+        # SVG user units are points (72 per inch); display units are pixels.
+        scale = 72.0 / fig.dpi
+        height = fig.get_figheight() * 72.0
+        (x0, y0), (x1, y1) = ax.transData.transform([(0.0, 0.0), (1.0, 1.0)])
+        self._ax, self._bx = x0 * scale, (x1 - x0) * scale
+        self._ay, self._by = height - y0 * scale, -(y1 - y0) * scale
+
+        buf = io.BytesIO()
+        # A fixed hash salt and no date keep the output identical across runs.
+        rc = {'svg.fonttype': 'none' if text else 'path', 'svg.hashsalt': 'titration-curve'}
+        with plt.rc_context(rc):
+            fig.savefig(buf, format='svg', metadata={'Date': None})
+        plt.close(fig)
+        svg = _compact_svg(buf.getvalue().decode('utf-8'))
+        self._head = svg[:svg.rindex('</svg>')]
+        self._advances = _label_advances(_ANNOT_FONTSIZE)
+
+    def _pt(self, x, y):
+        return self._ax + self._bx * x, self._ay + self._by * y
+
+    def render(self, recorded_vol: float) -> bytes:
+        parts = ['<g id="student-overlay">\n']
+
+        if self.xlim[0] <= recorded_vol <= self.xlim[1]:
+            x, top = self._pt(recorded_vol, self.ylim[1])
+            _, bottom = self._pt(recorded_vol, self.ylim[0])
+            parts.append(
+                f'<path d="M {x:.2f} {top:.2f} L {x:.2f} {bottom:.2f}" '
+                f'style="fill:none;stroke:{_STUDENT_COLOR};stroke-width:1.6;'
+                f'stroke-dasharray:5.92,2.56"/>\n'
+            )
+
+        # Error callout: rounded box with the label and an open arrow to the line
+        label = _error_label(recorded_vol, self.v_eq)
+        fs = _ANNOT_FONTSIZE
+        pad = 0.3 * fs
+        tx, ty = self._pt(recorded_vol + self.v_eq * 0.06, self.y_pos)
+        hx, hy = self._pt(recorded_vol, self.y_tip)
+        width = sum(self._advances.get(ch, 0.6 * fs) for ch in label)
+        bx, by = tx - pad, ty - 0.8 * fs - pad
+        bw, bh = width + 2 * pad, fs + 2 * pad
+
+        sx, sy = bx + bw / 2, by + bh / 2
+        dx, dy = hx - sx, hy - sy
+        norm = float(np.hypot(dx, dy)) or 1.0
+        ux, uy = dx / norm, dy / norm
+        hl, hw = 0.4 * fs, 0.2 * fs
+        h1 = (hx - ux * hl - uy * hw, hy - uy * hl + ux * hw)
+        h2 = (hx - ux * hl + uy * hw, hy - uy * hl - ux * hw)
+        parts.append(
+            f'<path d="M {sx:.2f} {sy:.2f} L {hx:.2f} {hy:.2f} '
+            f'M {h1[0]:.2f} {h1[1]:.2f} L {hx:.2f} {hy:.2f} L {h2[0]:.2f} {h2[1]:.2f}" '
+            f'style="fill:none;stroke:{_STUDENT_COLOR};stroke-width:1"/>\n'
+        )
+        parts.append(
+            f'<rect x="{bx:.2f}" y="{by:.2f}" width="{bw:.2f}" height="{bh:.2f}" rx="{pad:.2f}" '
+            f'style="fill:#FEF2F2;fill-opacity:0.95;stroke:#FCA5A5;stroke-width:1"/>\n'
+        )
+        parts.append(
+            f'<text x="{tx:.2f}" y="{ty:.2f}" '
+            f'style="font-family:\'DejaVu Serif\',serif;font-size:{fs}px;fill:{_STUDENT_COLOR}">'
+            f'{escape(label)}</text>\n'
+        )
+        parts.append('</g>\n</svg>\n')
+        return (self._head + ''.join(parts)).encode('utf-8')
+
+
+class _RasterLayer:
+    """Static pixels of a base figure plus the geometry of its axes.
+
+    Only the rendered background is kept: the figure is closed as soon as
+    it is drawn, so a layer costs one RGBA buffer.  Each render restores it
+    onto the shared overlay canvas and draws the student's line and callout
+    there.
+    """
 
-    ax.plot(V, pCa, color='#2563EB', lw=2.2, zorder=3,
+    def __init__(self, fig, ax, v_eq, y_pos, y_tip, fmt='png', dpi=_PNG_DPI):
+        self.v_eq, self.y_pos, self.y_tip = v_eq, y_pos, y_tip
+        self.fmt, self.dpi = fmt, dpi
+        self.size = (fig.get_figwidth(), fig.get_figheight())
+        self.position = ax.get_position()
+        self.xlim, self.ylim = ax.get_xlim(), ax.get_ylim()
+
+        fig.set_dpi(dpi)
+        fig.canvas.draw()
+        self.background = fig.canvas.copy_from_bbox(fig.bbox)
+        plt.close(fig)
+
+    def render(self, recorded_vol: float) -> bytes:
+        pixels = _overlay().draw(self, recorded_vol)
+        buf = io.BytesIO()
+        if self.fmt == 'webp':
+            from PIL import Image
+            Image.fromarray(pixels[..., :3]).save(buf, format='WEBP', lossless=True, method=2)
+        else:
+            mpimg.imsave(buf, pixels, format='png', dpi=self.dpi)
+        return buf.getvalue()
+
+
+class _Overlay:
+    """Figure holding the per-student artists, drawn over a restored background."""
+
+    def __init__(self):
+        self.fig, self.ax = _new_axes()
+        self.ax.set_axis_off()
+        self.line = self.ax.axvline(0, color=_STUDENT_COLOR, lw=1.6, ls='--', zorder=4, visible=False)
+        self.annotation = self.ax.annotate(
+            '',
+            xy=(0, 0),
+            xytext=(0, 0),
+            fontsize=_ANNOT_FONTSIZE,
+            color=_STUDENT_COLOR,
+            arrowprops=dict(arrowstyle='->', color=_STUDENT_COLOR, lw=1.0),
+            bbox=dict(boxstyle='round,pad=0.3', facecolor='#FEF2F2',
+                      edgecolor='#FCA5A5', alpha=0.95),
+            zorder=10,
+            visible=False,
+        )
+
+    def draw(self, layer: _RasterLayer, recorded_vol: float) -> np.ndarray:
+        """RGBA pixels of *layer*'s background with the overlay for *recorded_vol*."""
+        fig, ax = self.fig, self.ax
+        if fig.get_dpi() != layer.dpi or (fig.get_figwidth(), fig.get_figheight()) != layer.size:
+            fig.set_dpi(layer.dpi)
+            fig.set_size_inches(*layer.size)
+        ax.set_position(layer.position)
+        ax.set_xlim(layer.xlim)
+        ax.set_ylim(layer.ylim)
+
+        canvas = fig.canvas
+        canvas.restore_region(layer.background)
+        self.line.set_xdata([recorded_vol, recorded_vol])
+        self.annotation.set_text(_error_label(recorded_vol, layer.v_eq))
+        self.annotation.xy = (recorded_vol, layer.y_tip)
+        self.annotation.set_position((recorded_vol + layer.v_eq * 0.06, layer.y_pos))
+
+        for artist in (self.line, self.annotation):
+            artist.set_visible(True)
+            ax.draw_artist(artist)
+            artist.set_visible(False)
+        return np.asarray(canvas.buffer_rgba())
+
+
+_overlay_figure = None
+
+
+def _overlay() -> _Overlay:
+    global _overlay_figure
+    if _overlay_figure is None:
+        _overlay_figure = _Overlay()
+    return _overlay_figure
+
+
+_LAYERS: "OrderedDict[tuple, object]" = OrderedDict()
+_LAYERS_LOCK = threading.Lock()
+
+
+def _render_layered(key: tuple, build, recorded_vol: float, fmt: str,
+                    dpi: int = _PNG_DPI, svg_text: bool = True) -> bytes:
+    """Render *recorded_vol* over the cached base layer for *key*, building it if needed."""
+    layer_key = key + ((fmt, svg_text) if fmt == 'svg' else (fmt, dpi))
+    with _LAYERS_LOCK:
+        layer = _LAYERS.get(layer_key)
+        if layer is None:
+            fig, ax, v_eq, y_pos, y_tip = build()
+            if fmt == 'svg':
+                layer = _SvgLayer(fig, ax, v_eq, y_pos, y_tip, text=svg_text)
+            else:
+                layer = _RasterLayer(fig, ax, v_eq, y_pos, y_tip, fmt=fmt, dpi=dpi)
+            _LAYERS[layer_key] = layer
+            while len(_LAYERS) > settings.CURVE_BASE_LAYERS:
+                _LAYERS.popitem(last=False)
+        else:
+            _LAYERS.move_to_end(layer_key)
+        return layer.render(recorded_vol)
+
+
+# ── Base layer from a curve model ─────────────────────────────────────────────
+
+def _base_figure(model: dict):
+    """Draw the static part of the curve for *model*; return fig, ax and callout anchors."""
+    d = compute_curve(model)
+    curve = model['curve']
+    labels = curve.get('labels', {})
+    v_eq, tol = d['v_eq'], d['tolerance']
+
+    fig, ax = _new_axes()
+
+    ax.plot(d['volume'], d['px'], color='#2563EB', lw=2.2, zorder=3,
             label='Curva teórica')
 
-    tol = 0.3
-    ax.axvspan(V_eq - tol, V_eq + tol,
+    ax.axvspan(v_eq - tol, v_eq + tol,
                alpha=0.13, color='#16A34A', zorder=1,
                label=f'Tolerancia ±{tol} mL')
-    ax.axvline(V_eq, color='#16A34A', lw=1.6, ls='-', zorder=4,
-               label=f'Punto de equivalencia  {V_eq:.2f} mL')
-    ax.axvline(recorded_vol, color='#DC2626', lw=1.6, ls='--', zorder=4,
-               label=f'Lectura del estudiante  {recorded_vol:.2f} mL')
+    ax.axvline(v_eq, color='#16A34A', lw=1.6, ls='-', zorder=4,
+               label=f'Punto de equivalencia  {v_eq:.2f} mL')
 
     # Equivalence point marker
-    CaY_eq_scalar = n_Ca / (V0 + V_eq)
-    Ca_eq_scalar  = np.sqrt(CaY_eq_scalar / Kf_prime)
-    pCa_eq        = float(-np.log10(max(Ca_eq_scalar, 1e-15)))
-    ax.plot(V_eq, pCa_eq, 'o', color='#16A34A',
+    ax.plot(v_eq, d['px_eq'], 'o', color='#16A34A',
             ms=8, zorder=5, markeredgecolor='white', markeredgewidth=1)
 
-    y_max = float(pCa[V > V_eq * 0.1].max()) if any(V > V_eq * 0.1) else 12
-    _annotate_error(ax, recorded_vol, V_eq,
-                    y_pos=y_max * 0.92, y_tip=y_max * 0.72)
-
-    ax.set_xlabel(r'$V_{\mathrm{EDTA}}\ /\ \mathrm{mL}$', labelpad=6)
-    ax.set_ylabel(r'$\mathrm{p}[\mathrm{Ca}^{2+}]$', labelpad=6)
-    ax.set_title(
-        f'Curva de Titulación — Complejometría EDTA'
-        f'  ($V_{{\\mathrm{{muestra}}}}$ = {measured_value:.0f} mL)\n'
-        r'$\mathrm{Ca}^{2+}\ +\ \mathrm{HY}^{3-}\ \longrightarrow\ \mathrm{CaY}^{2-}\ +\ \mathrm{H}^{+}$',
-        pad=10,
-    )
-    ax.set_xlim(0, V_eq * 1.9)
-    ax.set_ylim(0, min(y_max * 1.08, 14))
-    ax.xaxis.set_minor_locator(ticker.AutoMinorLocator(4))
-    ax.yaxis.set_minor_locator(ticker.AutoMinorLocator(4))
-    ax.tick_params(which='minor', length=2, color='#94A3B8')
-    ax.legend(loc='upper left', framealpha=0.95)
+    title = labels.get('title', 'Curva de Titulación')
+    if 'sampleLabel' in labels:
+        measured = format(model['measured'], labels.get('sampleFormat', '.0f'))
+        title += f"  ({labels['sampleLabel']} = {measured} {model['measured_unit']})"
+    if 'reaction' in labels:
+        title += '\n' + labels['reaction']
+
+    ax.set_xlabel(labels.get('x', 'V / mL'), labelpad=6)
+    ax.set_ylabel(labels.get('y', 'pX'), labelpad=6)
+    ax.set_title(title, pad=10)
+    _finish_axes(fig, ax, d['x_max'], d['y_max'], curve.get('legendLoc', 'upper left'))
 
-    plt.tight_layout()
-    return _fig_to_bytes(fig, fmt)
+    y_pos, y_tip = curve.get('annotationY', [0.85, 0.67])
+    return fig, ax, v_eq, d['y_max'] * y_pos, d['y_max'] * y_tip
 
 
 # ── Public API ─────────────────────────────────────────────────────────────────
 
-def generate_titration_curve(practice_id: int, session_data: dict, fmt: str = 'svg') -> bytes:
+def generate_titration_curve(practice_id: int, session_data: dict, fmt: str = 'svg',
+                             dpi: int = None, svg_text: bool = True) -> bytes:
     """
-    Return image bytes (SVG or PNG) for the theoretical titration curve.
-    session_data must contain 'recorded_volume', 'expected_volume',
-    and (for P5) 'measured_value'.
-    fmt: 'svg' (default) or 'png'
+    Return image bytes (SVG, PNG or WebP) for the theoretical titration curve.
+    session_data holds 'recorded_volume', 'measured_value' and 'sample_id';
+    practices without a curve config raise ValueError.
+    fmt: 'svg' (default), 'png' or 'webp'
+    dpi: raster resolution (default 180)
+    svg_text: keep SVG text as <text> (default); False draws glyph outlines
     """
-    recorded_vol   = session_data.get('recorded_volume') or 0.0
-    expected_vol   = session_data.get('expected_volume') or 0.0
-    measured_value = session_data.get('measured_value') or 100.0
-
-    if practice_id == 4:
-        return _curve_p4(recorded_vol, expected_vol, fmt)
-    if practice_id == 5:
-        return _curve_p5(recorded_vol, measured_value, fmt)
-
-    raise ValueError(f"Curva de titulación no disponible para práctica {practice_id}")
+    model = curve_model(practice_id, session_data)
+    recorded_vol = session_data.get('recorded_volume') or 0.0
+    key = (practice_id, model['measured'], model['v_eq'])
+    return _render_layered(key, lambda: _base_figure(model), recorded_vol, fmt,
+                           dpi=dpi or _PNG_DPI, svg_text=svg_text)
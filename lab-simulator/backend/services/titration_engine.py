@@ -1,9 +1,33 @@
+from functools import lru_cache
+
 from data.registry import get_practice
 from services.calculation_engine import calculate_expected_volume
+from services.color_lut import get_color_lut
+
+# Slider ranges are a few thousand steps at most; this covers every
+# practice and sample with room to spare.
+_EXPECTED_VOLUME_CACHE_SIZE = 8192
+_RANGE_MAX_POINTS = 5000
+
+
+def _measurement_resolution(practice):
+    return (practice.get("measurement") or {}).get("resolution")
+
+
+def _quantize(value, step):
+    if not step:
+        return value
+    return round(round(value / step) * step, 10)
 
 
 def get_expected_volume(practice_id, measured_value, sample_id=None):
-    """Return expected volume and explanation for a practice."""
+    """Return expected volume and explanation for a practice.
+
+    Always computed from the exact *measured_value*.  Values on the
+    instrument resolution grid declared in the practice's measurement
+    config (what the slider produces) are memoized per (practice, sample,
+    value); anything else is computed without caching.
+    """
     practice = get_practice(practice_id)
     if practice is None:
         raise ValueError(f"Practice {practice_id} not found")
@@ -12,6 +36,18 @@ def get_expected_volume(practice_id, measured_value, sample_id=None):
     if titration is None:
         raise ValueError(f"Practice {practice_id} has no titration config")
 
+    # The sample only matters for practices with per-sample volume tables
+    if "volumesBySample" not in titration:
+        sample_id = None
+    measured = float(measured_value)
+    if _quantize(measured, _measurement_resolution(practice)) == measured:
+        return dict(_expected_volume_cached(practice_id, sample_id, measured))
+    return _expected_volume(practice_id, sample_id, measured)
+
+
+def _expected_volume(practice_id, sample_id, measured_value):
+    practice = get_practice(practice_id)
+    titration = practice["titration"]
     volume = calculate_expected_volume(practice, measured_value, sample_id)
 
     explanation = (
@@ -25,37 +61,57 @@ def get_expected_volume(practice_id, measured_value, sample_id=None):
     }
 
 
-def get_color_at_progress(practice_id, progress):
-    """Interpolate color for a given titration progress."""
+_expected_volume_cached = lru_cache(maxsize=_EXPECTED_VOLUME_CACHE_SIZE)(_expected_volume)
+
+
+def get_expected_volume_range(practice_id, sample_id=None, start=None, stop=None, step=None):
+    """Expected volumes for every measured value from *start* to *stop*.
+
+    Defaults cover the measurement's slider range at the instrument
+    resolution, so the client can look values up locally while the
+    student drags the slider.  Evaluated in one vectorized pass.
+    """
+    import numpy as np
+
     practice = get_practice(practice_id)
     if practice is None:
-        return "#F0F0F0"
+        raise ValueError(f"Practice {practice_id} not found")
+    if practice.get("titration") is None:
+        raise ValueError(f"Practice {practice_id} has no titration config")
 
-    transitions = practice.get("titration", {}).get("colorTransitions", [])
-    if not transitions:
-        return "#F0F0F0"
+    measurement = practice.get("measurement") or {}
+    low, high = measurement.get("range", [measurement.get("defaultValue", 0)] * 2)
+    start = low if start is None else start
+    stop = high if stop is None else stop
+    step = step or _measurement_resolution(practice) or (stop - start) / 100 or 1.0
+    if stop < start:
+        raise ValueError("El inicio del rango debe ser menor o igual que el final")
+
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    if count > _RANGE_MAX_POINTS:
+        raise ValueError(f"El rango pedido tiene {count} puntos (máximo {_RANGE_MAX_POINTS})")
+
+    measured = np.round(start + np.arange(count) * step, 10)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volumes = calculate_expected_volume(practice, measured, sample_id)
+    volumes = np.broadcast_to(volumes, measured.shape)
 
-    if progress <= transitions[0]["progress"]:
-        return transitions[0]["color"]
-    if progress >= transitions[-1]["progress"]:
-        return transitions[-1]["color"]
-
-    for i in range(len(transitions) - 1):
-        curr = transitions[i]
-        nxt = transitions[i + 1]
-        if curr["progress"] <= progress <= nxt["progress"]:
-            t = (progress - curr["progress"]) / (nxt["progress"] - curr["progress"])
-            # Simple RGB interpolation
-            c1 = _hex_to_rgb(curr["color"])
-            c2 = _hex_to_rgb(nxt["color"])
-            r = int(c1[0] + (c2[0] - c1[0]) * t)
-            g = int(c1[1] + (c2[1] - c1[1]) * t)
-            b = int(c1[2] + (c2[2] - c1[2]) * t)
-            return f"#{r:02x}{g:02x}{b:02x}"
-
-    return transitions[-1]["color"]
-
-
-def _hex_to_rgb(hex_color):
-    hex_color = hex_color.lstrip("#")
-    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+    return {
+        "practice_id": practice_id,
+        "sample_id": sample_id,
+        "start": float(measured[0]),
+        "step": float(step),
+        "count": count,
+        "measured_values": measured.tolist(),
+        "expected_volumes": [
+            v if np.isfinite(v) else None for v in np.round(volumes, 4).tolist()
+        ],
+    }
+
+
+def get_color_at_progress(practice_id, progress):
+    """Color for a given titration progress, from the practice's color LUT."""
+    lut = get_color_lut(practice_id)
+    if lut is None:
+        return "#F0F0F0"
+    return lut.color(progress)
@@ -0,0 +1,108 @@
+"""
+Append-only journal of server-side burette events.
+
+The burette store (``services.titration_state``) lives in one API process.
+Every drop, stream step and reset it applies is also appended to the
+``titration_events`` table, so a session's burette can be rebuilt from the
+database after a restart or by another worker: ``replay`` returns the
+volume and drop/stream counts since the session's last reset.
+
+Writes stay off the request path.  ``record`` only queues the events of a
+flush; a background task inserts everything queued so far in one
+multi-row ``INSERT`` and exits when the queue is empty.  Each event keeps
+the volume the store reported after it, so a replay returns exactly the
+state the student last saw rather than re-summing rounded additions.
+
+Events are ordered by their autoincrement id, so a session should titrate
+against one worker at a time; the journal covers restarts and failover,
+not two workers adding to the same burette at once.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import async_session
+from models.titration_event import TitrationEvent
+
+logger = logging.getLogger("lab_simulator.titration")
+
+
+class TitrationJournal:
+    """Queued, batched writer and reader of ``titration_events``."""
+
+    def __init__(self):
+        self._events: list = []
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, session_ids: Iterable[str], kinds: Iterable[str],
+               amounts: Iterable[float], volumes: Iterable[float]) -> None:
+        """Queue one event per item; must be called from the event loop."""
+        now = datetime.utcnow()
+        self._events.extend(
+            {"session_id": s, "kind": k, "amount": a, "volume": v, "created_at": now}
+            for s, k, a, v in zip(session_ids, kinds, amounts, volumes)
+        )
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._write())
+
+    def record_reset(self, session_id: str) -> None:
+        self.record([session_id], ["reset"], [0.0], [0.0])
+
+    async def _write(self) -> None:
+        while self._events:
+            events, self._events = self._events, []
+            try:
+                async with async_session() as db:
+                    await db.execute(insert(TitrationEvent), events)
+                    await db.commit()
+            except Exception:
+                logger.exception("titration journal: %d events not written", len(events))
+
+    async def needs_reset(self, db: AsyncSession, session_id: str) -> bool:
+        """True when *session_id* has additions since its last reset (queued or written)."""
+        for event in reversed(self._events):
+            if event["session_id"] == session_id:
+                return event["kind"] != "reset"
+        last = (await db.execute(
+            select(TitrationEvent.kind)
+            .where(TitrationEvent.session_id == session_id)
+            .order_by(TitrationEvent.id.desc())
+            .limit(1)
+        )).scalar_one_or_none()
+        return last not in (None, "reset")
+
+    async def flush(self) -> None:
+        """Wait until every queued event is written (shutdown, tests)."""
+        task = self._task
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            await task
+
+    async def replay(self, db: AsyncSession, session_id: str) -> Optional[dict]:
+        """Burette state of *session_id* since its last reset, or ``None`` if it has none."""
+        last_reset = (
+            select(func.coalesce(func.max(TitrationEvent.id), 0))
+            .where(TitrationEvent.session_id == session_id, TitrationEvent.kind == "reset")
+            .scalar_subquery()
+        )
+        rows = (await db.execute(
+            select(TitrationEvent.kind, TitrationEvent.volume)
+            .where(TitrationEvent.session_id == session_id, TitrationEvent.id > last_reset)
+            .order_by(TitrationEvent.id)
+        )).all()
+        if not rows:
+            return None
+        kinds = [row.kind for row in rows]
+        return {
+            "volume": rows[-1].volume,
+            "drops": kinds.count("drop"),
+            "streams": kinds.count("stream"),
+        }
+
+
+titration_journal = TitrationJournal()
@@ -0,0 +1,293 @@
+"""
+Server-side burette state for titrations in progress.
+
+Every open session owns one slot in a struct-of-arrays store: a NumPy
+array per field (volume added, drop/stream size, equivalence volume, the
+pX model parameters, ...), indexed by slot.  Drops and streams are applied
+to all sessions at once:
+
+- ``TitrationStateStore.step(slots, amounts)`` adds titrant for many
+  slots in one vectorized pass and returns their new state.
+- ``TitrationStateStore.add(session_id, kind)`` is the per-request entry
+  point.  Additions arriving in the same event-loop iteration are queued
+  and flushed together through ``step``, so a burst of requests from a
+  whole class costs one pass instead of one per drop.
+
+The state returned for a session is only what the titration canvas
+redraws after each addition: volume, progress, pX (from the curve engine's
+kernel), color (from the practice's color LUT), the endpoint flags and the
+precipitate fill (the 0–1 factor the canvas applies to the practice's
+dynamic precipitate layers).  It is built column-wise: colors come from one
+hex table shared by every practice, indexed by per-slot LUT offset, so no
+per-session Python work is left besides packing the response dicts.
+
+The store lives in the API process and is touched only from the event
+loop, so it needs no locking.  Idle sessions are evicted after
+``settings.TITRATION_IDLE_TTL`` seconds when their slot is needed.  Every
+addition is also appended to the burette journal
+(``services.titration_journal``), from which a session evicted here, or
+opened on another worker after a restart, is restored.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from data.registry import get_practice
+from services.color_lut import get_color_lut
+from services.curve_engine import CHEMISTRY_CODES, curve_model, px_kernel
+from services.titration_journal import titration_journal
+
+_DEFAULT_COLOR = "#F0F0F0"
+
+_STATE_KEYS = (
+    "volume_added", "progress", "px", "color", "near_endpoint", "past_endpoint", "precipitate_fill",
+)
+
+# Per-slot float fields; all float64 so kernel inputs need no conversion.
+_FLOAT_FIELDS = (
+    "volume", "max_volume", "drop", "stream", "v_eq", "tolerance",
+    "v0", "K", "n_X", "c_titrant", "p_complement", "p_lo", "p_hi",
+    "k_competing", "reagent_total",
+    "lut_start", "lut_stop", "lut_scale", "last_used",
+)
+_INT_FIELDS = ("practice", "chemistry", "lut_offset", "lut_size", "drops", "streams")
+
+
+class TitrationStateStore:
+    """Struct-of-arrays burette state for many concurrent sessions."""
+
+    def __init__(self, capacity: int = None, idle_ttl: float = None, journal=None):
+        capacity = capacity or settings.TITRATION_STORE_CAPACITY
+        self.idle_ttl = settings.TITRATION_IDLE_TTL if idle_ttl is None else idle_ttl
+        self.capacity = 0
+        self._slots: Dict[str, int] = {}
+        self._sessions: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._pending: list = []
+        self._flush_scheduled = False
+        self.journal = journal
+        # Every practice's LUT back to back, each followed by its exact
+        # first and last config colors; the block at 0 is the default for
+        # practices without color transitions.
+        self._colors = np.array([_DEFAULT_COLOR] * 3, dtype=object)
+        self._lut_offsets: Dict[int, int] = {}
+        for name in _FLOAT_FIELDS:
+            setattr(self, name, np.zeros(0))
+        for name in _INT_FIELDS:
+            setattr(self, name, np.zeros(0, dtype=np.int64))
+        self._grow(capacity)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    # ── Slots ────────────────────────────────────────────────────────────────
+
+    def _grow(self, capacity: int) -> None:
+        extra = capacity - self.capacity
+        for name in _FLOAT_FIELDS + _INT_FIELDS:
+            arr = getattr(self, name)
+            setattr(self, name, np.concatenate([arr, np.zeros(extra, dtype=arr.dtype)]))
+        self._sessions.extend([None] * extra)
+        self._free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def _evict_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        for slot in np.nonzero(self.last_used < cutoff)[0].tolist():
+            session_id = self._sessions[slot]
+            if session_id is not None:
+                self.discard(session_id)
+
+    def _allocate(self) -> int:
+        if not self._free:
+            self._evict_idle()
+        if not self._free:
+            self._grow(self.capacity * 2)
+        return self._free.pop()
+
+    def _lut_offset(self, practice_id: int, lut) -> int:
+        offset = self._lut_offsets.get(practice_id)
+        if offset is None:
+            offset = len(self._colors) if lut else 0
+            if lut:
+                colors = lut.hex + [lut.first, lut.last]
+                self._colors = np.concatenate([self._colors, np.array(colors, dtype=object)])
+            self._lut_offsets[practice_id] = offset
+        return offset
+
+    def open(self, session_id: str, practice_id: int, session_data: dict,
+             restored: Optional[dict] = None) -> int:
+        """Start (or restart) the titration of *session_id* with an empty burette.
+
+        *session_data* supplies ``measured_value`` and ``sample_id``;
+        *restored* (``volume``, ``drops``, ``streams`` from the journal's
+        ``replay``) starts it where it was left instead.  Raises
+        ``ValueError`` when the practice has no titration curve config.
+        """
+        model = curve_model(practice_id, session_data)
+        titration = get_practice(practice_id)["titration"]
+        lut = get_color_lut(practice_id)
+        lut_offset = self._lut_offset(practice_id, lut)
+
+        slot = self._slots.get(session_id)
+        if slot is None:
+            slot = self._allocate()
+            self._slots[session_id] = slot
+            self._sessions[slot] = session_id
+
+        lo, hi = model["p_range"]
+        values = {
+            "volume": 0.0,
+            "max_volume": titration.get("maxBuretteVolume", 50),
+            "drop": titration.get("dropVolume", 0.05),
+            "stream": titration.get("streamVolume", 0.50),
+            "v_eq": model["v_eq"],
+            "tolerance": model["tolerance"],
+            "v0": model["v0"],
+            "K": model["K"],
+            "n_X": model["n_analyte"],
+            "c_titrant": model["c_titrant"],
+            "p_complement": np.nan if model["p_complement"] is None else model["p_complement"],
+            "p_lo": lo,
+            "p_hi": hi,
+            "k_competing": model["k_competing"],
+            "reagent_total": model["reagent_total"],
+            "lut_start": lut.start if lut else 0.0,
+            "lut_stop": lut.stop if lut else 0.0,
+            "lut_scale": (lut.size - 1) / (lut.stop - lut.start) if lut and lut.stop > lut.start else 0.0,
+            "last_used": time.monotonic(),
+            "practice": practice_id,
+            "chemistry": CHEMISTRY_CODES[model["chemistry"]],
+            "lut_offset": lut_offset,
+            "lut_size": lut.size if lut else 1,
+            "drops": 0,
+            "streams": 0,
+        }
+        if restored:
+            values.update(restored)
+        for name, value in values.items():
+            getattr(self, name)[slot] = value
+        return slot
+
+    def discard(self, session_id: str) -> None:
+        """Forget *session_id*'s burette state (no-op when not open)."""
+        slot = self._slots.pop(session_id, None)
+        if slot is None:
+            return
+        self._sessions[slot] = None
+        self.last_used[slot] = np.inf
+        self._free.append(slot)
+
+    def slot_of(self, session_id: str) -> int:
+        return self._slots[session_id]
+
+    # ── Vectorized update ────────────────────────────────────────────────────
+
+    def step(self, slots, amounts=None) -> List[dict]:
+        """Add *amounts* (mL) of titrant to *slots* and return their states.
+
+        A slot listed more than once receives every addition; all of its
+        entries report the state after the whole batch.  ``amounts=None``
+        only reads the current state.
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        if amounts is not None:
+            np.add.at(self.volume, slots, np.asarray(amounts, dtype=float))
+            self.volume[slots] = np.round(np.minimum(self.volume[slots], self.max_volume[slots]), 2)
+        self.last_used[slots] = time.monotonic()
+        return self._states(slots)
+
+    def _states(self, slots: np.ndarray) -> List[dict]:
+        volume = self.volume[slots]
+        v_eq = self.v_eq[slots]
+        progress = np.divide(volume, v_eq, out=np.zeros_like(volume), where=v_eq > 0)
+        px = px_kernel(
+            volume, self.v0[slots], self.K[slots], self.n_X[slots], self.c_titrant[slots],
+            self.chemistry[slots], self.p_complement[slots], self.p_lo[slots], self.p_hi[slots],
+            self.k_competing[slots], self.reagent_total[slots],
+        )
+        lut_size = self.lut_size[slots]
+        lut_index = self.lut_offset[slots] + np.where(
+            progress <= self.lut_start[slots], lut_size,
+            np.where(
+                progress >= self.lut_stop[slots], lut_size + 1,
+                np.clip(np.rint((progress - self.lut_start[slots]) * self.lut_scale[slots]), 0, lut_size - 1),
+            ),
+        ).astype(np.int64)
+        columns = zip(
+            volume.tolist(),
+            np.round(progress, 4).tolist(),
+            np.round(px, 3).tolist(),
+            self._colors[lut_index].tolist(),
+            (np.abs(volume - v_eq) <= self.tolerance[slots]).tolist(),
+            (volume > v_eq * 1.10).tolist(),
+            np.round(np.minimum(progress, 1.0), 4).tolist(),
+        )
+        return [dict(zip(_STATE_KEYS, row)) for row in columns]
+
+    # ── Per-request entry point ──────────────────────────────────────────────
+
+    async def add(self, session_id: str, kind: str) -> dict:
+        """Apply one ``"drop"`` or ``"stream"`` to an open session.
+
+        Additions from concurrent requests are batched into a single
+        ``step`` at the end of the current event-loop iteration.  Raises
+        ``KeyError`` when the session is discarded before the batch runs.
+        """
+        slot = self._slots[session_id]
+        if kind == "drop":
+            amount = self.drop[slot]
+            self.drops[slot] += 1
+        else:
+            amount = self.stream[slot]
+            self.streams[slot] += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((session_id, kind, slot, amount, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        pending, self._pending = self._pending, []
+        self._flush_scheduled = False
+
+        # A session discarded or reopened since its add() no longer owns the slot
+        live = []
+        for entry in pending:
+            session_id, _, slot, _, future = entry
+            if self._slots.get(session_id) == slot:
+                live.append(entry)
+            elif not future.done():
+                future.set_exception(KeyError(session_id))
+        if not live:
+            return
+
+        session_ids, kinds, slots, amounts, futures = zip(*live)
+        try:
+            states = self.step(slots, amounts)
+        except Exception as exc:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future, state in zip(futures, states):
+            if not future.done():
+                future.set_result(state)
+        if self.journal is not None:
+            self.journal.record(session_ids, kinds, amounts, self.volume[list(slots)].tolist())
+
+    def state(self, session_id: str) -> dict:
+        """Current state of an open session, without adding titrant."""
+        return self.step([self._slots[session_id]])[0]
+
+
+titration_store = TitrationStateStore(journal=titration_journal)
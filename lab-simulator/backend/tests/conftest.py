@@ -0,0 +1,56 @@
+"""
+Shared fixtures: the API over a throwaway SQLite database.
+
+``DATABASE_URL`` must be set before ``config`` is first imported, so it is
+set here at collection time.  Curves render on the pool's single
+background thread instead of spawned worker processes.
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="lab-simulator-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_DB_DIR}/test.db"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from config import settings
+    from main import app
+    from services.render_pool import render_pool
+
+    settings.CURVE_WARMUP = False
+    render_pool.workers = 0
+    with TestClient(app) as client:
+        yield client
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def run(client):
+    """Run a coroutine function on the app's event loop: ``run(fn, *args)``."""
+    return client.portal.call
+
+
+@pytest.fixture
+def new_session(client):
+    """Factory for sessions with their measurement and burette reading saved."""
+    def create(practice_id=5, measured_value=100.0, unit="mL", recorded_volume=None):
+        response = client.post("/api/sessions", json={"practice_id": practice_id, "student_name": "Prueba"})
+        assert response.status_code == 200, response.text
+        session_id = response.json()["id"]
+        if measured_value is not None:
+            response = client.put(f"/api/sessions/{session_id}/measurement",
+                                  json={"value": measured_value, "unit": unit})
+            assert response.status_code == 200, response.text
+        if recorded_volume is not None:
+            response = client.put(f"/api/sessions/{session_id}/titration",
+                                  json={"recorded_volume": recorded_volume})
+            assert response.status_code == 200, response.text
+        return session_id
+    return create
@@ -0,0 +1,59 @@
+import pytest
+
+import data.practices  # noqa: F401  -- registers the practices
+from services.formula_compiler import get_formula
+
+
+def test_validate_batch_applies_last_duplicate(client, new_session):
+    repeated = new_session(recorded_volume=6.5)
+    other = new_session(recorded_volume=6.5)
+
+    response = client.post("/api/calculations/validate-batch", json={"items": [
+        {"session_id": repeated, "student_result": 10.0},
+        {"session_id": other, "student_result": 65.0},
+        {"session_id": repeated, "student_result": 65.06},
+    ]})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["validated"], body["failed"]) == (2, 1)
+
+    first, second, last = body["results"]
+    assert first["error"] == "Sesión repetida en el lote; se aplica su último resultado"
+    assert first["correct_result"] is None
+    assert second["error"] is None and second["is_within_tolerance"]
+    assert last["error"] is None and last["correct_result"] == 65.06
+
+    session = client.get(f"/api/sessions/{repeated}").json()
+    assert session["student_calculation"] == 65.06
+
+
+def test_validate_batch_reports_unusable_sessions(client, new_session):
+    unread = new_session()
+    body = client.post("/api/calculations/validate-batch", json={"items": [
+        {"session_id": "no-existe", "student_result": 1.0},
+        {"session_id": unread, "student_result": 1.0},
+    ]}).json()
+
+    assert (body["validated"], body["failed"]) == (0, 2)
+    assert [r["error"] for r in body["results"]] == [
+        "Sesión no encontrada",
+        "No se ha registrado lectura de bureta",
+    ]
+
+
+# Results of the hand-written formulas the compiled expressions replaced
+@pytest.mark.parametrize("practice_id, recorded_volume, measured_value, expected", [
+    (5, 6.5, 100.0, 65.06),
+    (4, 12.5, 10.0, 14.18),
+    (3, 10.0, 10.0, 0.35),
+    (2, 10.0, 1.0, 420.82),
+])
+def test_formula_compiler_matches_baseline(client, new_session, practice_id,
+                                           recorded_volume, measured_value, expected):
+    assert round(get_formula(practice_id)(recorded_volume, measured_value), 2) == expected
+
+    session_id = new_session(practice_id, measured_value, recorded_volume=recorded_volume)
+    response = client.post("/api/calculations/validate",
+                           json={"session_id": session_id, "student_result": expected})
+    assert response.status_code == 200, response.text
+    assert response.json()["correct_result"] == expected
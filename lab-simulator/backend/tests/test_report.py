@@ -0,0 +1,45 @@
+from sqlalchemy import func, select
+
+from database import async_session
+from models.result import PracticeResult
+
+
+def _result_rows(run, session_id):
+    async def count():
+        async with async_session() as db:
+            return (await db.execute(
+                select(func.count()).select_from(PracticeResult)
+                .where(PracticeResult.session_id == session_id)
+            )).scalar_one()
+    return run(count)
+
+
+def test_report_is_stored_once(client, run, new_session):
+    session_id = new_session(recorded_volume=6.5)
+
+    first = client.get(f"/api/sessions/{session_id}/report")
+    assert first.status_code == 200, first.text
+    report = first.json()
+    for _ in range(4):
+        assert client.get(f"/api/sessions/{session_id}/report").json() == report
+
+    assert _result_rows(run, session_id) == len(report["criteria"])
+    session = client.get(f"/api/sessions/{session_id}").json()
+    assert session["status"] == "completed"
+    assert session["total_score"] == report["total_score"]
+
+
+def test_scored_change_regenerates_report(client, run, new_session):
+    session_id = new_session(recorded_volume=6.5)
+    report = client.get(f"/api/sessions/{session_id}/report").json()
+
+    client.put(f"/api/sessions/{session_id}/titration", json={"recorded_volume": 9.0})
+    regenerated = client.get(f"/api/sessions/{session_id}/report").json()
+
+    assert regenerated["completed_at"] != report["completed_at"]
+    assert regenerated["criteria"] != report["criteria"]
+    assert _result_rows(run, session_id) == len(regenerated["criteria"])
+
+
+def test_report_unknown_session(client):
+    assert client.get("/api/sessions/no-existe/report").status_code == 404
@@ -0,0 +1,39 @@
+def test_matching_etag_answers_304(client, new_session):
+    session_id = new_session(recorded_volume=6.5)
+    url = f"/api/sessions/{session_id}/titration-curve"
+
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("image/svg+xml")
+    assert b"<text" in response.content
+    etag = response.headers["etag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"otra", {etag}', "*"):
+        cached = client.get(url, headers={"If-None-Match": if_none_match, "Accept-Encoding": "identity"})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+
+
+def test_etag_follows_variant_and_inputs(client, new_session):
+    session_id = new_session(recorded_volume=6.5)
+    url = f"/api/sessions/{session_id}/titration-curve"
+    etag = client.get(url).headers["etag"]
+
+    glyphs = client.get(url, params={"text": "false"}, headers={"If-None-Match": etag})
+    assert glyphs.status_code == 200
+    assert b"<text" not in glyphs.content.split(b'<g id="student-overlay">')[0]
+    assert glyphs.headers["etag"] != etag
+
+    png = client.get(url, params={"format": "png"}, headers={"If-None-Match": etag})
+    assert png.status_code == 200
+    assert png.headers["content-type"] == "image/png"
+
+    client.put(f"/api/sessions/{session_id}/titration", json={"recorded_volume": 7.0})
+    moved = client.get(url, headers={"If-None-Match": etag})
+    assert moved.status_code == 200
+    assert moved.headers["etag"] != etag
+
+
+def test_curve_unknown_session(client):
+    assert client.get("/api/sessions/no-existe/titration-curve").status_code == 404
@@ -0,0 +1,42 @@
+from services.titration_journal import titration_journal
+
+
+def _evict(run, session_id):
+    """Write the queued events and drop the burette, as after a restart."""
+    from services.titration_state import titration_store
+    run(titration_journal.flush)
+    titration_store.discard(session_id)
+
+
+def test_drops_survive_eviction(client, run, new_session):
+    session_id = new_session()
+    base = f"/api/sessions/{session_id}/titration"
+
+    for _ in range(3):
+        state = client.post(f"{base}/drop").json()
+    state = client.post(f"{base}/stream").json()
+    assert state["volume_added"] == 0.65
+
+    _evict(run, session_id)
+    restored = client.get(f"{base}/state").json()
+    assert restored["volume_added"] == state["volume_added"]
+    assert client.post(f"{base}/drop").json()["volume_added"] == 0.7
+
+
+def test_reset_and_new_measurement_empty_the_replay(client, run, new_session):
+    session_id = new_session()
+    base = f"/api/sessions/{session_id}/titration"
+
+    client.post(f"{base}/stream")
+    assert client.post(f"{base}/reset").json()["volume_added"] == 0.0
+    client.post(f"{base}/drop")
+    _evict(run, session_id)
+    assert client.get(f"{base}/state").json()["volume_added"] == 0.05
+
+    client.put(f"/api/sessions/{session_id}/measurement", json={"value": 120.0, "unit": "mL"})
+    _evict(run, session_id)
+    assert client.get(f"{base}/state").json()["volume_added"] == 0.0
+
+
+def test_titration_unknown_session(client):
+    assert client.post("/api/sessions/no-existe/titration/drop").status_code == 404
@@ -22,6 +22,8 @@ async function request(path, options = {}) {
 export const getPractices = () => request('/practices');
 export const getPractice = (id) => request(`/practices/${id}`);
 export const getPracticeMaterials = (id) => request(`/practices/${id}/materials`);
+export const getPracticeColorLut = (id, encoding = 'rgb') =>
+  request(`/practices/${id}/color-lut?encoding=${encoding}`);
 
 // Sessions
 export const createSession = (data) =>
@@ -53,11 +55,40 @@ export const updateTitration = (sessionId, recordedVolume) =>
     body: JSON.stringify({ recorded_volume: recordedVolume }),
   });
 
+// Several of the updates above in one request, e.g.
+// { stage: { stage, data }, titration: { recorded_volume } }
+export const patchSession = (sessionId, changes) =>
+  request(`/sessions/${sessionId}`, {
+    method: 'PATCH',
+    body: JSON.stringify(changes),
+  });
+
+// Server-side burette: kind is 'drop' or 'stream'. Returns volume_added,
+// progress, px, color, near_endpoint, past_endpoint and precipitate_fill
+// (0-1 factor for the practice's dynamic precipitate layers).
+export const addTitrant = (sessionId, kind = 'drop') =>
+  request(`/sessions/${sessionId}/titration/${kind}`, { method: 'POST' });
+
+export const getTitrationState = (sessionId) =>
+  request(`/sessions/${sessionId}/titration/state`);
+
+export const resetTitrationState = (sessionId) =>
+  request(`/sessions/${sessionId}/titration/reset`, { method: 'POST' });
+
 // Calculations
-export const validateCalculation = (sessionId, studentResult, formulaUsed = null) =>
+// uncertainty = true adds confidence_interval and deviation_explainable
+export const validateCalculation = (sessionId, studentResult, formulaUsed = null, uncertainty = false) =>
   request('/calculations/validate', {
     method: 'POST',
-    body: JSON.stringify({ session_id: sessionId, student_result: studentResult, formula_used: formulaUsed }),
+    body: JSON.stringify({
+      session_id: sessionId, student_result: studentResult, formula_used: formulaUsed, uncertainty,
+    }),
+  });
+
+export const validateCalculationBatch = (items) =>
+  request('/calculations/validate-batch', {
+    method: 'POST',
+    body: JSON.stringify({ items }),
   });
 
 export const getExpectedVolume = (practiceId, measuredValue, sampleId = null) =>
@@ -66,9 +97,18 @@ export const getExpectedVolume = (practiceId, measuredValue, sampleId = null) =>
     body: JSON.stringify({ practice_id: practiceId, measured_value: measuredValue, sample_id: sampleId }),
   });
 
+export const getExpectedVolumeRange = (practiceId, sampleId = null, { start, stop, step } = {}) =>
+  request('/calculations/expected-volume/range', {
+    method: 'POST',
+    body: JSON.stringify({ practice_id: practiceId, sample_id: sampleId, start, stop, step }),
+  });
+
 // Reports
 export const getReport = (sessionId) => request(`/sessions/${sessionId}/report`);
 
+export const getTitrationCurveData = (sessionId, points = 400, encoding = 'json') =>
+  request(`/sessions/${sessionId}/titration-curve/data?points=${points}&encoding=${encoding}`);
+
 // Teacher – Sections
 export const getSections = () => request('/teacher/sections');
 
@@ -110,3 +150,30 @@ export const deleteSectionPractice = (id) =>
 // Teacher – Grades
 export const upsertGrade = (data) =>
   request('/teacher/grades', { method: 'PUT', body: JSON.stringify(data) });
+
+// Teacher – Section scores (recomputed, not saved)
+export const getSectionScores = (code, practiceId = null) =>
+  request(`/teacher/sections/${code}/scores${practiceId != null ? `?practice_id=${practiceId}` : ''}`);
+
+// Admin – Rescoring of completed sessions (background job)
+export const startRescore = (data = {}) =>
+  request('/admin/rescore', { method: 'POST', body: JSON.stringify(data) });
+
+export const getRescoreJob = (jobId) => request(`/admin/rescore/${jobId}`);
+
+// Admin – SQL statement timings
+export const getQueryStats = (limit = 20) => request(`/admin/query-stats?limit=${limit}`);
+
+// Teacher – Curve export (ZIP download)
+export const exportCurves = async (data) => {
+  const response = await fetch(`${BASE_URL}/teacher/curves/export`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(data),
+  });
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({ detail: 'Error de red' }));
+    throw new Error(error.detail || `Error ${response.status}`);
+  }
+  return response.blob();
+};
@@ -192,3 +192,22 @@ export function darkenTransitions(transitions) {
     return { ...t, color: rgbToHex(newRgb.r, newRgb.g, newRgb.b) };
   });
 }
+
+/**
+ * Decode a color table from GET /practices/{id}/color-lut (encoding=rgb).
+ * @returns {{start: number, stop: number, size: number, rgb: Uint8Array}}
+ */
+export function decodeColorLut({ start, stop, size, colors }) {
+  const rgb = Uint8Array.from(atob(colors), c => c.charCodeAt(0));
+  return { start, stop, size, rgb };
+}
+
+/**
+ * Color at a titration progress from a decoded table — one clamp and index.
+ */
+export function getColorFromLut(lut, progress) {
+  const span = lut.stop - lut.start;
+  const pos = span > 0 ? Math.round((progress - lut.start) / span * (lut.size - 1)) : 0;
+  const i = Math.max(0, Math.min(lut.size - 1, pos)) * 3;
+  return rgbToHex(lut.rgb[i], lut.rgb[i + 1], lut.rgb[i + 2]);
+}